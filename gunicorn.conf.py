@@ -0,0 +1,11 @@
+# Notification streams keep one connection open per browser tab, so workers serve
+# requests from greenlets to hold thousands of idle connections cheaply.
+worker_class = 'gevent'
+worker_connections = 1000
+
+
+def post_fork(server, worker):
+    """Makes psycopg2 yield to other greenlets while waiting for Postgres."""
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
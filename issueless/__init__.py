@@ -8,9 +8,13 @@ from pyngrok import ngrok
 
 from issueless import auth
 from issueless import errors
+from issueless import events
+from issueless.decorators import clear_memberships
 from issueless import issue
+from issueless import jobs
 from issueless import main
 from issueless import project
+from issueless import user_index
 from issueless.login import login
 from issueless.models import db
 from issueless.oauth import oauth
@@ -34,6 +38,9 @@ def create_app(test_config=None):
     login.init_app(app)
     Migrate(app, db)
     oauth.init_app(app)
+    events.init_app(app)
+    jobs.init_app(app)
+    user_index.init_app(app)
 
     app.register_blueprint(auth.bp)
     app.register_blueprint(errors.bp)
@@ -41,6 +48,7 @@ def create_app(test_config=None):
     app.register_blueprint(main.bp)
     app.register_blueprint(project.bp)
     app.add_url_rule('/dashboard', endpoint='index')
+    app.teardown_request(clear_memberships)
 
     if not app.debug and not app.testing:
         if app.config['LOG_TO_STDOUT']:
@@ -90,9 +98,16 @@ def create_app(test_config=None):
 
     @app.cli.command("insert-roles")
     def insert_roles():
+        """Inserts or updates roles, then reloads the role registry."""
         from issueless.models import Role
 
         Role.insert_roles()
+        Role.refresh_registry()
+
+    @app.cli.command("worker")
+    def worker():
+        """Runs the jobs enqueued by requests, see issueless.jobs."""
+        jobs.work()
 
     def start_ngrok():
         url = ngrok.connect(5000)
@@ -2,6 +2,7 @@ from flask import abort, current_app, redirect, request, url_for
 from flask_login import current_user, login_user, logout_user
 from six.moves.urllib.parse import urlencode
 
+from issueless import user_index
 from issueless.auth import bp
 from issueless.models import db, User
 from issueless.oauth import configure_oauth
@@ -46,6 +47,8 @@ def callback():
             last_name=userinfo['family_name'],
         )
         db.session.add(user)
+        db.session.flush()
+        user_index.notify_new_user(db.session, user)
         db.session.commit()
     login_user(user, remember=True)
 
@@ -0,0 +1,131 @@
+"""Avatars served from a local disk cache instead of Gravatar.
+
+An avatar is fetched from Gravatar the first time it is requested and kept under
+AVATAR_PATH, the instance folder's avatars directory by default. Cached avatars are
+fetched again once they are older than MAX_AGE, and kept as they are if Gravatar does
+not answer. Gravatar answers for any hash, so callers only load the avatars of
+existing users, which bounds the cache by the number of users.
+
+When an avatar is not cached and Gravatar is unreachable, or disabled by setting
+GRAVATAR_URL to None, an identicon is generated from the hash instead. Generated
+identicons are not cached, so the real avatar shows up once Gravatar is reachable.
+After a failed fetch, Gravatar is not tried again for RETRY_DELAY seconds, so an
+unreachable Gravatar does not stall every request.
+
+  Typical usage example:
+
+  path = load(avatar_hash)
+  if path is None:
+      svg = identicon(avatar_hash)
+"""
+
+import os
+import re
+from time import time
+
+from flask import current_app
+import requests
+
+GRAVATAR_URL = 'https://www.gravatar.com/avatar/{}?d=identicon&s=68'
+HASH_PATTERN = re.compile(r'[0-9a-f]{32}$')
+MAX_AGE = 7 * 24 * 60 * 60
+RETRY_DELAY = 60
+TIMEOUT = 2
+
+_extensions = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/gif': '.gif'}
+_retry_at = 0
+
+
+def load(avatar_hash):
+    """Gets the path of a cached avatar, fetching it from Gravatar if needed.
+
+    Args:
+        avatar_hash: A user's avatar hash.
+
+    Returns:
+        The path of the cached avatar, None if it is not cached and can not be
+        fetched.
+    """
+
+    directory = current_app.config.get(
+        'AVATAR_PATH', os.path.join(current_app.instance_path, 'avatars')
+    )
+    path = _find(directory, avatar_hash)
+    if path is not None and os.path.getmtime(path) > time() - MAX_AGE:
+        return path
+
+    fetched = _fetch(avatar_hash)
+    if fetched is None:
+        return path
+
+    content, extension = fetched
+    stale_path = path
+    path = os.path.join(directory, avatar_hash + extension)
+    os.makedirs(directory, exist_ok=True)
+    # Written aside and renamed, so concurrent requests never read a partial image.
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    if stale_path is not None and stale_path != path:
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            # Another worker has already replaced it.
+            pass
+    return path
+
+
+def _find(directory, avatar_hash):
+    for extension in _extensions.values():
+        path = os.path.join(directory, avatar_hash + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _fetch(avatar_hash):
+    global _retry_at
+    url = current_app.config.get('GRAVATAR_URL', GRAVATAR_URL)
+    if url is None or time() < _retry_at:
+        return None
+    try:
+        resp = requests.get(url.format(avatar_hash), timeout=TIMEOUT)
+        resp.raise_for_status()
+    except requests.RequestException:
+        current_app.logger.warning('Failed to fetch avatar %s.', avatar_hash)
+        _retry_at = time() + RETRY_DELAY
+        return None
+    content_type = resp.headers.get('Content-Type', '').split(';')[0]
+    if content_type not in _extensions:
+        return None
+    return resp.content, _extensions[content_type]
+
+
+def identicon(avatar_hash):
+    """Generates an identicon from an avatar hash.
+
+    The identicon is a horizontally symmetric 5x5 pattern. The first 15 hex digits of
+    the hash decide which cells of the left three columns are filled, and the last 7
+    decide the color.
+
+    Args:
+        avatar_hash: A user's avatar hash.
+
+    Returns:
+        The identicon as an SVG document.
+    """
+
+    hue = int(avatar_hash[-7:], 16) % 360
+    cells = []
+    for i, digit in enumerate(avatar_hash[:15]):
+        if int(digit, 16) % 2 == 0:
+            column, row = divmod(i, 5)
+            for x in sorted({column, 4 - column}):
+                cells.append(f'<rect x="{x}" y="{row}" width="1" height="1"/>')
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="-0.5 -0.5 6 6" '
+        'width="68" height="68" shape-rendering="crispEdges">'
+        '<rect x="-0.5" y="-0.5" width="6" height="6" fill="#f0f0f0"/>'
+        f'<g fill="hsl({hue}, 55%, 50%)">{"".join(cells)}</g></svg>'
+    )
@@ -8,15 +8,62 @@ def create:
 
 from functools import wraps
 
-from flask import abort
+from flask import abort, g
 from flask_login import current_user
 
-from issueless.models import Comment, File, Issue, Permission, Project
+from issueless.models import (
+    db,
+    Comment,
+    File,
+    Issue,
+    Permission,
+    Project,
+    Role,
+    UserProject,
+)
+
+
+def get_membership(project_id):
+    """Gets current user's membership of a project.
+
+    Loads the project, current user's UserProject and its role with one joined query
+    and memoizes them on flask.g, so later lookups in the same request, including
+    lazy loads of user_project.project and user_project.role, do not query again.
+
+    Args:
+        project_id: The project's id.
+
+    Returns:
+        A (project, user_project, role) tuple. Every item is None if the project does
+        not exist. user_project and role are None if current user is not a member.
+    """
+
+    memberships = g.setdefault('memberships', {})
+    key = (current_user.id, project_id)
+    if key not in memberships:
+        memberships[key] = (
+            db.session.query(Project, UserProject, Role)
+            .outerjoin(
+                UserProject,
+                (UserProject.project_id == Project.id)
+                & (UserProject.user_id == current_user.id),
+            )
+            .outerjoin(Role, Role.id == UserProject.role_id)
+            .filter(Project.id == project_id)
+            .first()
+        ) or (None, None, None)
+    return memberships[key]
+
+
+def clear_memberships(exception=None):
+    """Drops the memoized memberships at the end of a request."""
+    g.pop('memberships', None)
 
 
 def _get_user_project(id):
-    project = Project.query.get_or_404(id)
-    user_project = current_user.user_projects.filter_by(project=project).first()
+    project, user_project, role = get_membership(id)
+    if project is None:
+        abort(404)
     if user_project is None:
         abort(403)
     return user_project
@@ -25,7 +72,7 @@ def _get_user_project(id):
 def _get_issue(project_id, issue_id):
     user_project = _get_user_project(project_id)
     issue = Issue.query.get_or_404(issue_id)
-    if user_project.project != issue.project:
+    if user_project.project_id != issue.project_id:
         abort(400)
     return (user_project, issue)
 
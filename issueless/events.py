@@ -0,0 +1,196 @@
+"""A publish/subscribe event bus.
+
+Views that hold a long-lived connection, such as the notification stream, subscribe
+to a channel and block on the returned queue. Messages are sent from a database
+session and published when its transaction commits, nothing is published if it rolls
+back.
+
+With Postgres, messages are sent through pg_notify, so they reach the subscribers of
+every worker process. All messages of a transaction are batched into as few
+notifications as fit, sent by one statement before it commits. Each worker runs one
+listener thread, started on its first subscription, which splits the notifications
+and dispatches their messages to its subscribers. Otherwise, for example in tests,
+messages are only published to subscribers in the same process.
+
+Publishers never block, a message is dropped for a subscriber whose queue is full,
+since subscribers only use messages as a signal to re-read the database.
+
+  Typical usage example:
+
+  queue = subscribe('notifications:1')
+  send(db.session, 'notifications:1', 'new')
+  db.session.commit()
+  queue.get(timeout=15)
+"""
+
+from collections import defaultdict
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import text
+
+PG_CHANNEL = 'issueless_events'
+# Postgres limits a notification's payload to 8000 bytes.
+MAX_PAYLOAD_SIZE = 7000
+
+logger = logging.getLogger(__name__)
+
+_subscribers = defaultdict(set)
+_lock = threading.Lock()
+_dsn = None
+_listener = None
+
+
+def init_app(app):
+    """Enables pg_notify delivery if the app runs on Postgres.
+
+    It is enabled by default outside of testing, and can be switched with the
+    EVENT_BUS configuration.
+    """
+
+    global _dsn
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if app.config.get('EVENT_BUS', not app.testing) and uri.startswith('postgres'):
+        _dsn = uri
+    else:
+        _dsn = None
+
+
+def subscribe(channel):
+    """Subscribes to a channel.
+
+    Args:
+        channel: The channel's name.
+
+    Returns:
+        A queue receiving every message published to the channel.
+    """
+
+    _start_listener()
+    subscriber = queue.Queue(maxsize=100)
+    with _lock:
+        _subscribers[channel].add(subscriber)
+    return subscriber
+
+
+def unsubscribe(channel, subscriber):
+    with _lock:
+        subscribers = _subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del _subscribers[channel]
+
+
+def send(session, channel, message):
+    """Sends a message to be published when the session's transaction commits.
+
+    Args:
+        session: The database session the message belongs to.
+        channel: The channel's name.
+        message: A JSON serializable message.
+    """
+
+    session.info.setdefault('pending_events', []).append((channel, message))
+
+
+def send_pending(session):
+    """Sends the messages of a session through pg_notify, called before it commits.
+
+    The session is flushed first, so messages sent while flushing are included.
+    Postgres only delivers the notifications once the transaction commits.
+    """
+
+    if _dsn is None:
+        return
+    session.flush()
+    messages = session.info.pop('pending_events', None)
+    if messages:
+        session.execute(
+            text('SELECT pg_notify(:channel, payload) FROM unnest(:payloads) payload'),
+            {'channel': PG_CHANNEL, 'payloads': _batch_payloads(messages)},
+        )
+
+
+def publish(channel, message):
+    """Publishes a message to subscribers in the current process."""
+    with _lock:
+        subscribers = list(_subscribers.get(channel, ()))
+    for subscriber in subscribers:
+        try:
+            subscriber.put_nowait(message)
+        except queue.Full:
+            pass
+
+
+def notification_channel(user_id):
+    return f'notifications:{user_id}'
+
+
+def publish_pending(session):
+    """Publishes the messages sent from a session, called after it commits."""
+    for channel, message in session.info.pop('pending_events', ()):
+        publish(channel, message)
+
+
+def discard_pending(session):
+    """Discards the messages sent from a session, called after it rolls back."""
+    session.info.pop('pending_events', None)
+
+
+def _batch_payloads(messages):
+    """Packs (channel, message) pairs into as few JSON arrays as fit in a payload."""
+    payloads = []
+    batch = []
+    size = 2
+    for channel, message in messages:
+        item = json.dumps([channel, message])
+        if batch and size + len(item) + 1 > MAX_PAYLOAD_SIZE:
+            payloads.append(f'[{",".join(batch)}]')
+            batch = []
+            size = 2
+        batch.append(item)
+        size += len(item) + 1
+    if batch:
+        payloads.append(f'[{",".join(batch)}]')
+    return payloads
+
+
+def _start_listener():
+    global _listener
+    if _dsn is None:
+        return
+    with _lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(
+                target=_listen, args=(_dsn,), name='event-listener', daemon=True
+            )
+            _listener.start()
+
+
+def _listen(dsn):
+    """Dispatches Postgres notifications, reconnecting if the connection drops."""
+    while True:
+        try:
+            connection = psycopg2.connect(dsn)
+            connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {PG_CHANNEL};')
+
+            while True:
+                if select.select([connection], [], [], 60) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    for channel, message in json.loads(notify.payload):
+                        publish(channel, message)
+        except psycopg2.Error:
+            logger.exception('Event listener lost its connection, reconnecting.')
+            time.sleep(5)
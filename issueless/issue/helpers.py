@@ -1,7 +1,14 @@
+import os
+import shutil
+from uuid import uuid4
+
+from flask import current_app
 from flask_login import current_user
+from sqlalchemy import event
 
+from issueless import jobs
 from issueless.errors.errors import ValidationError
-from issueless.models import User
+from issueless.models import db, User
 
 
 def create_validation(title, description):
@@ -26,14 +33,14 @@ def edit_validation(
             raise ValidationError('Please provide a valid priority level.')
 
         assignee = User.query.get_or_404(assignee_id)
-        if assignee not in project.users:
+        if not project.has_member(assignee.id):
             raise ValidationError('The user you chose is not a member of the project.')
 
         if (
             issue.title == title
             and issue.description == description
             and priority == issue.priority
-            and assignee == issue.assignee
+            and assignee.id == issue.assignee_id
         ):
             raise ValidationError('No changes have been made.')
         return assignee
@@ -59,7 +66,7 @@ def assign_validation(project, issue, priority, assignee_id):
         error = 'Please provide a valid priority level.'
 
     assignee = User.query.get_or_404(assignee_id)
-    if assignee not in project.users:
+    if not project.has_member(assignee.id):
         error = 'The user you chose is not a member of the project.'
 
     return error
@@ -83,7 +90,45 @@ def comment_validation(text):
 
 
 def admin_reviewer_add_notification(project, name, data, target_id=None):
-    admin_reviewers = project.get_admin_reviewers()
-    for user in admin_reviewers:
-        if user != current_user:
-            user.add_notification(name, data, target_id)
+    jobs.enqueue(
+        'fan out notification',
+        user_ids=[
+            user_id
+            for user_id in project.get_admin_reviewer_ids()
+            if user_id != current_user.id
+        ],
+        name=name,
+        data=data,
+        target_id=target_id,
+        actor_id=current_user.id,
+    )
+
+
+def remove_upload(*path):
+    """Removes a file or a directory under the upload path once the session commits.
+
+    It is moved aside at once, so a file uploaded with the same name after the commit
+    is not removed in its place, and moved back if the session rolls back.
+    """
+
+    path = os.path.join(current_app.config['UPLOAD_PATH'], *path)
+    if not os.path.exists(path):
+        return
+    removed = f'{path}.{uuid4().hex}.removed'
+    os.replace(path, removed)
+    db.session.info.setdefault('removed_uploads', []).append((path, removed))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _remove_uploads(session):
+    for _, removed in session.info.pop('removed_uploads', ()):
+        if os.path.isdir(removed):
+            shutil.rmtree(removed, ignore_errors=True)
+        elif os.path.exists(removed):
+            os.remove(removed)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _restore_uploads(session, previous_transaction):
+    for path, removed in reversed(session.info.pop('removed_uploads', ())):
+        os.replace(removed, path)
@@ -1,5 +1,4 @@
 import os
-import shutil
 from time import time
 
 from flask import (
@@ -36,6 +35,7 @@ from issueless.issue.helpers import (
     comment_validation,
     create_validation,
     edit_validation,
+    remove_upload,
     sizeof_fmt,
 )
 from issueless.models import db, Comment, File, Issue, Permission, UserProject
@@ -102,14 +102,7 @@ def create(user_project):
         )
         db.session.add(new_issue)
         admin_reviewer_add_notification(
-            project,
-            'new issue',
-            {
-                'avatar': current_user.avatar(),
-                'fullname': current_user.fullname(),
-                'projectTitle': project.title,
-                'issueTitle': title,
-            },
+            project, 'new issue', {'projectTitle': project.title, 'issueTitle': title}
         )
         db.session.commit()
         os.makedirs(os.path.join(current_app.config['UPLOAD_PATH'], str(new_issue.id)))
@@ -189,22 +182,11 @@ def edit(project, issue):
         if issue.assignee != new_assignee:
             if issue.assignee != current_user:
                 issue.assignee.add_notification(
-                    'remove assignee',
-                    {
-                        'avatar': current_user.avatar(),
-                        'fullname': current_user.fullname(),
-                        'issueTitle': issue.title,
-                    },
+                    'remove assignee', {'issueTitle': issue.title}
                 )
             if new_assignee != current_user:
                 new_assignee.add_notification(
-                    'assign issue',
-                    {
-                        'avatar': current_user.avatar(),
-                        'fullname': current_user.fullname(),
-                        'projectId': project.id,
-                    },
-                    issue.id,
+                    'assign issue', {'projectId': project.id}, issue.id
                 )
             issue.assignee_id = assignee_id
     else:
@@ -250,25 +232,16 @@ def delete(project, issue):
 
     db.session.delete(issue)
     data = {
-        'avatar': current_user.avatar(),
-        'fullname': current_user.fullname(),
         'projectTitle': project.title,
         'issueTitle': issue.title,
     }
     if issue.creator != current_user:
-        issue.creator.add_notification(
-            'delete issue', data,
-        )
+        issue.creator.add_notification('delete issue', data)
     if issue.assignee is not None and issue.assignee != current_user:
-        issue.assignee.add_notification(
-            'delete issue', data,
-        )
+        issue.assignee.add_notification('delete issue', data)
+    remove_upload(str(issue.id))
 
     db.session.commit()
-    shutil.rmtree(
-        os.path.join(current_app.config['UPLOAD_PATH'], str(issue.id)),
-        ignore_errors=True,
-    )
     return redirect(url_for('project.project', id=project.id))
 
 
@@ -320,13 +293,7 @@ def assign(project, issue):
         issue.assignee_id = assignee_id
         if issue.assignee != current_user:
             issue.assignee.add_notification(
-                'assign issue',
-                {
-                    'avatar': current_user.avatar(),
-                    'fullname': current_user.fullname(),
-                    'projectId': project.id,
-                },
-                issue.id,
+                'assign issue', {'projectId': project.id}, issue.id
             )
         db.session.commit()
 
@@ -373,13 +340,7 @@ def restore(project, issue):
         if issue.assignee is None:
             status = 'Open'
             admin_reviewer_add_notification(
-                project,
-                'mark open',
-                {
-                    'avatar': current_user.avatar(),
-                    'fullname': current_user.fullname(),
-                    'issueTitle': issue.title,
-                },
+                project, 'mark open', {'issueTitle': issue.title}
             )
         else:
             status = 'In Progress'
@@ -387,8 +348,6 @@ def restore(project, issue):
                 issue.assignee.add_notification(
                     'mark in progress',
                     {
-                        'avatar': current_user.avatar(),
-                        'fullname': current_user.fullname(),
                         'issueTitle': issue.title,
                         'preStatus': issue.status,
                         'projectId': project.id,
@@ -402,8 +361,6 @@ def restore(project, issue):
             issue.assignee.add_notification(
                 'mark in progress',
                 {
-                    'avatar': current_user.avatar(),
-                    'fullname': current_user.fullname(),
                     'issueTitle': issue.title,
                     'preStatus': issue.status,
                     'projectId': project.id,
@@ -453,14 +410,7 @@ def resolve(project, issue):
     issue.status = 'Resolved'
     issue.resolved_timestamp = time()
 
-    issue.assignee.add_notification(
-        'mark resolved',
-        {
-            'avatar': current_user.avatar(),
-            'fullname': current_user.fullname(),
-            'issueTitle': issue.title,
-        },
-    )
+    issue.assignee.add_notification('mark resolved', {'issueTitle': issue.title})
 
     db.session.commit()
     return redirect(redirect_url)
@@ -502,23 +452,9 @@ def close(project, issue):
     issue.closed_timestamp = time()
 
     if issue.assignee is None:
-        issue.creator.add_notification(
-            'mark closed',
-            {
-                'avatar': current_user.avatar(),
-                'fullname': current_user.fullname(),
-                'issueTitle': issue.title,
-            },
-        )
+        issue.creator.add_notification('mark closed', {'issueTitle': issue.title})
     else:
-        issue.assignee.add_notification(
-            'mark closed',
-            {
-                'avatar': current_user.avatar(),
-                'fullname': current_user.fullname(),
-                'issueTitle': issue.title,
-            },
-        )
+        issue.assignee.add_notification('mark closed', {'issueTitle': issue.title})
 
     db.session.commit()
     return redirect(redirect_url)
@@ -595,10 +531,8 @@ def download(issue, file):
 def delete_file(issue, file):
     """Removes file form database and file system."""
     db.session.delete(file)
+    remove_upload(str(issue.id), file.filename)
     db.session.commit()
-    os.remove(
-        os.path.join(current_app.config['UPLOAD_PATH'], str(issue.id), file.filename)
-    )
     return {'success': True}
 
 
@@ -616,24 +550,11 @@ def comment(project, issue):
         db.session.add(new_comment)
         if current_user == issue.assignee:
             admin_reviewer_add_notification(
-                project,
-                'new comment',
-                {
-                    'avatar': current_user.avatar(),
-                    'fullname': current_user.fullname(),
-                    'projectId': project.id,
-                },
-                issue.id,
+                project, 'new comment', {'projectId': project.id}, issue.id
             )
         else:
             issue.assignee.add_notification(
-                'new comment',
-                {
-                    'avatar': current_user.avatar(),
-                    'fullname': current_user.fullname(),
-                    'projectId': project.id,
-                },
-                issue.id,
+                'new comment', {'projectId': project.id}, issue.id
             )
         db.session.commit()
     return redirect(url_for('issue.issue', id=project.id, issue_id=issue.id))
@@ -0,0 +1,108 @@
+"""A job queue for side effects that do not need to finish within the request.
+
+Views enqueue jobs into the database session, so a job is only created if the
+request's transaction commits. `flask worker` runs them. Workers claim due jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can share the jobs table
+without running a job twice, and run each job in the transaction which deletes it.
+A failed job is retried later with an exponential backoff, and kept with its last
+error once it has failed MAX_ATTEMPTS times. The worker runs in another process,
+possibly on another machine, so jobs must not depend on the web process's files.
+
+In eager mode, the default in testing, jobs run as soon as they are enqueued. It can
+be switched with the JOBS_EAGER configuration.
+
+  Typical usage example:
+
+  enqueue('fan out notification', user_ids=[1, 2], name='new comment', data=data,
+          target_id=1, actor_id=3)
+  db.session.commit()
+"""
+
+import logging
+from time import sleep, time
+import traceback
+
+from issueless.models import db, Job, Notification
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 10
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_eager = False
+
+
+def init_app(app):
+    global _eager
+    _eager = app.config.get('JOBS_EAGER', app.testing)
+
+
+def handler(name):
+    """Registers the decorated function as the handler of the jobs with this name."""
+
+    def decorator(f):
+        _handlers[name] = f
+        return f
+
+    return decorator
+
+
+def enqueue(name, /, **args):
+    """Adds a job to the current database session.
+
+    Args:
+        name: The job's name.
+        **args: JSON serializable arguments passed to the job's handler.
+    """
+
+    if _eager:
+        _handlers[name](**args)
+    else:
+        db.session.add(Job(name=name, args=args))
+
+
+def run_next():
+    """Claims and runs the next due job.
+
+    Returns:
+        False if no job is due, True otherwise.
+    """
+
+    job = (
+        Job.query.filter(Job.run_at <= time())
+        .order_by(Job.run_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return False
+
+    try:
+        with db.session.begin_nested():
+            _handlers[job.name](**job.args)
+    except Exception:
+        logger.exception('Job %s failed.', job)
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+        if job.attempts < MAX_ATTEMPTS:
+            job.run_at = time() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        else:
+            job.run_at = None
+    else:
+        db.session.delete(job)
+    db.session.commit()
+    return True
+
+
+def work(poll_interval=1):
+    """Runs due jobs forever, waiting poll_interval seconds whenever none is due."""
+    while True:
+        if not run_next():
+            sleep(poll_interval)
+
+
+@handler('fan out notification')
+def fan_out_notification(user_ids, name, data, target_id, actor_id):
+    Notification.fan_out(user_ids, name, data, target_id, actor_id)
@@ -1,7 +1,19 @@
-from flask import abort
+from flask import abort, current_app, Markup, render_template
 from flask_login import current_user
+from sqlalchemy.orm import contains_eager
 
-from issueless.models import Notification
+from issueless.models import (
+    db,
+    Comment,
+    Issue,
+    Notification,
+    Project,
+    Role,
+    UserProject,
+)
+
+PROGRESS_BAR_COLORS = ['bg-danger', 'bg-warning', 'bg-primary', 'bg-success', 'bg-info']
+PROJECT_CARD_CACHE_SIZE = 256
 
 
 def get_notification(id):
@@ -9,3 +21,123 @@ def get_notification(id):
     if notification.user != current_user:
         abort(403)
     return notification
+
+
+def parse_notification_cursor(cursor):
+    """Parses a cursor produced by format_notification_cursor().
+
+    Aborts with 400 if the cursor is malformed.
+
+    Returns:
+        A (timestamp, id) tuple.
+    """
+
+    try:
+        timestamp, id = cursor.split('_')
+        return float(timestamp), int(id)
+    except ValueError:
+        abort(400)
+
+
+def format_notification_cursor(cursor):
+    """Formats a (timestamp, id) tuple as a cursor for a query string."""
+    timestamp, id = cursor
+    return f'{timestamp!r}_{id}'
+
+
+def get_missing_review_issues(user):
+    """Gets the In Progress issues waiting for the user's review.
+
+    An issue is waiting for review if it belongs to a project where the user is an
+    admin or a reviewer, it is assigned to someone else, and its latest comment was
+    submitted by the assignee. Everything is answered by one query, the latest
+    commenter of each issue is found with a correlated subquery.
+
+    Args:
+        user: The reviewing user.
+
+    Returns:
+        A list of issues with their projects loaded.
+    """
+
+    latest_commenter_id = (
+        db.session.query(Comment.user_id)
+        .filter(Comment.issue_id == Issue.id)
+        .order_by(Comment.timestamp.desc())
+        .limit(1)
+        .correlate(Issue)
+        .as_scalar()
+    )
+
+    return (
+        Issue.query.join(Issue.project)
+        .join(Project.user_projects)
+        .filter(
+            UserProject.user_id == user.id,
+            UserProject.role_id.in_([Role.get_id('Admin'), Role.get_id('Reviewer')]),
+            Issue.status == 'In Progress',
+            Issue.assignee_id != user.id,
+            Issue.assignee_id == latest_commenter_id,
+        )
+        .options(contains_eager(Issue.project))
+        .order_by(Issue.timestamp)
+        .all()
+    )
+
+
+def render_project_cards(user_projects):
+    """Renders the dashboard cards of a user's projects, or gets them from the cache.
+
+    A card only depends on the project's version, the user's role and the color of its
+    progress bar, which is picked by the card's position. The members and issue counts
+    of all projects missing from the cache are loaded with one query each.
+
+    Args:
+        user_projects: The user's memberships with their projects and roles loaded,
+            in the order of the cards.
+
+    Returns:
+        A list of rendered cards.
+    """
+
+    cache = current_app.extensions.setdefault('project_card_cache', {})
+    keys = [
+        (
+            user_project.project.id,
+            user_project.project.version,
+            user_project.role.name,
+            PROGRESS_BAR_COLORS[index % len(PROGRESS_BAR_COLORS)],
+        )
+        for index, user_project in enumerate(user_projects)
+    ]
+    cards = {key: cache.get(key) for key in keys}
+    missing = {
+        key: user_project.project
+        for user_project, key in zip(user_projects, keys)
+        if cards[key] is None
+    }
+    if missing:
+        project_ids = [project.id for project in missing.values()]
+        members = Project.get_top_members(project_ids, 10)
+        issue_counts = Project.get_issue_counts(project_ids)
+        if len(cache) + len(missing) > PROJECT_CARD_CACHE_SIZE:
+            cache.clear()
+        for key, project in missing.items():
+            user_count, users = members.get(project.id, (0, []))
+            counts = issue_counts.get(project.id, {})
+            resolved_issues_count = counts.get('Resolved', 0)
+            cards[key] = cache[key] = Markup(
+                render_template(
+                    'dashboard_project_card.html',
+                    project=project,
+                    role=key[2],
+                    progress_bar_color=key[3],
+                    members=users,
+                    user_count=user_count,
+                    resolved_issues_count=resolved_issues_count,
+                    total_issues_count=counts.get('Open', 0)
+                    + counts.get('In Progress', 0)
+                    + resolved_issues_count,
+                )
+            )
+    return [cards[key] for key in keys]
@@ -1,18 +1,33 @@
-from flask import abort, redirect, render_template, request, url_for
+import json
+import os
+import queue
+from time import time
+
+from flask import (
+    abort,
+    current_app,
+    redirect,
+    render_template,
+    request,
+    Response,
+    send_file,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
 
+from issueless import avatars
+from issueless import events
 from issueless.errors.errors import ValidationError
 from issueless.main import bp
-from issueless.models import (
-    db,
-    Comment,
-    Issue,
-    Notification,
-    Project,
-    Role,
-    UserProject,
+from issueless.models import db, Issue, Notification, User, UserProject
+from issueless.main.helpers import (
+    format_notification_cursor,
+    get_missing_review_issues,
+    get_notification,
+    parse_notification_cursor,
+    render_project_cards,
 )
-from issueless.main.helpers import get_notification
 
 
 @bp.route('/')
@@ -25,15 +40,18 @@ def index():
 @login_required
 def dashboard():
     """Returns the dashboard page."""
-    user_projects = current_user.user_projects.order_by(UserProject.timestamp)
+    user_projects = (
+        current_user.user_projects.options(
+            db.joinedload(UserProject.project), db.joinedload(UserProject.role)
+        )
+        .order_by(UserProject.timestamp)
+        .all()
+    )
     return render_template(
         'dashboard.html',
         title='Dashboard',
         user_projects=user_projects,
-        project_users=[
-            user_project.project.user_projects.order_by(UserProject.timestamp)
-            for user_project in user_projects
-        ],
+        project_cards=render_project_cards(user_projects),
         assigned_issues=current_user.assigned_issues.filter_by(
             status='In Progress', priority='High'
         )
@@ -48,24 +66,60 @@ def dashboard():
                 status='In Progress', priority='Low'
             ).order_by(Issue.timestamp)
         ),
-        missing_review_issues=[
-            issue
-            for issue in Issue.query.filter(
-                Issue.status == 'In Progress', Issue.assignee != current_user
-            )
-            .join(Issue.project)
-            .join(Project.user_projects)
-            .filter(UserProject.user == current_user)
-            .filter(
-                (UserProject.role == Role.query.filter_by(name='Admin').first())
-                | (UserProject.role == Role.query.filter_by(name='Reviewer').first())
-            )
-            if issue.comments.order_by(Comment.timestamp.desc()).limit(1).first().user
-            == issue.assignee
-        ],
+        missing_review_issues=get_missing_review_issues(current_user),
     )
 
 
+@bp.route('/avatars/<avatar_hash>')
+@login_required
+def avatar(avatar_hash):
+    """Returns a user's avatar.
+
+    Avatars are served from a local cache of Gravatar, see issueless.avatars. An avatar
+    which is neither cached nor available from Gravatar is replaced by an identicon
+    generated from the hash, which browsers only cache for a while.
+
+    Produces:
+        image/png
+        image/jpeg
+        image/gif
+        image/svg+xml
+
+    Args:
+        avatar_hash:
+            in: path
+            type: string
+            description: The md5 of the user's lowercased email.
+
+    Responses:
+        200:
+            description: The avatar.
+        404:
+            description: Invalid avatar hash, or no user has this avatar hash.
+    """
+
+    if not avatars.HASH_PATTERN.match(avatar_hash):
+        abort(404)
+    # Gravatar answers any hash, so only the avatars of existing users are fetched
+    # and cached.
+    users = User.query.filter_by(avatar_hash=avatar_hash)
+    if not db.session.query(users.exists()).scalar():
+        abort(404)
+
+    path = avatars.load(avatar_hash)
+    if path is None:
+        response = current_app.response_class(
+            avatars.identicon(avatar_hash), mimetype='image/svg+xml'
+        )
+        response.cache_control.max_age = 3600
+    else:
+        response = send_file(
+            os.path.abspath(path), conditional=True, cache_timeout=avatars.MAX_AGE
+        )
+    response.cache_control.public = True
+    return response
+
+
 @bp.route('/notifications')
 @login_required
 def notifications():
@@ -73,7 +127,15 @@ def notifications():
 
     Returns current user's notifications. If path parameter 'since' is provided,
     returns notifications created after the timestamp indicating by 'since'. Otherwise,
-    returns all of the user's notifications.
+    returns a page of at most 'limit' notifications, newest first, starting after
+    'cursor'. 'next' is the cursor of the following page, or null on the last page.
+
+    Notifications only carry their actor's id. The display data of every actor is
+    loaded once and sent alongside in 'actors', keyed by user id.
+
+    The response's ETag is made of the version of current user's notifications and
+    the requested page. If the ETag in If-None-Match is still current, nothing has
+    changed since that response and the notifications are not queried at all.
 
     Produces:
         application/json
@@ -83,27 +145,149 @@ def notifications():
             in: path
             type: float
             description: A unix timestamp.
+        cursor:
+            in: path
+            type: string
+            description: The 'next' cursor of the previous page.
+        limit:
+            in: path
+            type: int
+            description: The page size, 20 by default and 50 at most.
+        If-None-Match:
+            in: header
+            type: string
+            description: The ETag of a previous response.
 
     Responses:
         200:
             description: Current user's notifications.
+        304:
+            description: Notifications have not changed.
+        400:
+            description: Bad request.
     """
 
     since = request.args.get('since', type=float)
-
+    before = limit = None
     if since is None:
-        notifications = current_user.notifications.order_by(
-            Notification.timestamp.desc()
-        )
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            before = parse_notification_cursor(cursor)
+        limit = request.args.get('limit', default=20, type=int)
+        if limit < 1:
+            abort(400)
+        limit = min(limit, 50)
+
+    if since is not None:
+        page = f'since-{since!r}'
+    elif before is not None:
+        page = f'{format_notification_cursor(before)}-{limit}'
     else:
-        notifications = current_user.notifications.filter(
-            Notification.timestamp > since
-        ).order_by(Notification.timestamp)
+        page = f'first-{limit}'
+    etag = f'{current_user.notification_etag()}.{page}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # Notifications are serialized by the database and spliced into the response, so
+    # their payloads are never decoded and re-encoded here.
+    notifications_json, actor_ids, count, oldest = Notification.json_array(
+        current_user.id, since, before, limit
+    )
+    actors_json = json.dumps(User.get_actors(actor_ids))
+    next_cursor = None
+    if limit is not None and count == limit:
+        next_cursor = format_notification_cursor(oldest)
+    response = current_app.response_class(
+        f'{{"success": true, "notifications": {notifications_json}, '
+        f'"actors": {actors_json}, "next": {json.dumps(next_cursor)}}}',
+        mimetype='application/json',
+    )
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response
+
 
-    return {
-        'success': True,
-        'notifications': [notification.to_dict() for notification in notifications],
-    }
+@bp.route('/notifications/unread-count')
+@login_required
+def unread_notification_count():
+    """Returns the number of current user's unread notifications.
+
+    The count is kept on the user's row, so no notification is queried.
+
+    Produces:
+        application/json
+
+    Responses:
+        200:
+            description: The number of unread notifications.
+    """
+
+    return {'success': True, 'count': current_user.unread_notification_count}
+
+
+@bp.route('/notifications/stream')
+@login_required
+def notification_stream():
+    """Streams current user's new notifications as Server-Sent Events.
+
+    Streams every notification created after the timestamp indicated by 'since', or
+    by the Last-Event-ID header when the browser reconnects. The stream wakes up when
+    a notification for current user is committed, sends a comment every 15 seconds
+    to keep the connection alive and ends after 5 minutes, after which the browser
+    reconnects by itself. The display data of the actors of each batch of new
+    notifications is sent first, as an 'actors' event.
+
+    Produces:
+        text/event-stream
+
+    Args:
+        since:
+            in: path
+            type: float
+            description: A unix timestamp.
+
+    Responses:
+        200:
+            description: A stream of notification events.
+    """
+
+    since = request.headers.get('Last-Event-ID', type=float)
+    if since is None:
+        since = request.args.get('since', default=time(), type=float)
+    user_id = current_user.id
+
+    def generate():
+        nonlocal since
+        channel = events.notification_channel(user_id)
+        subscriber = events.subscribe(channel)
+        try:
+            deadline = time() + 300
+            while time() < deadline:
+                notifications = Notification.query_json(user_id, since).all()
+                actors = User.get_actors(actor_id for _, actor_id, _ in notifications)
+                # Hand the connection back to the pool while waiting.
+                db.session.close()
+                if actors:
+                    yield f'event: actors\ndata: {json.dumps(actors)}\n\n'
+                for timestamp, _, notification_json in notifications:
+                    since = timestamp
+                    yield f'id: {timestamp!r}\ndata: {notification_json}\n\n'
+
+                try:
+                    subscriber.get(timeout=15)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            events.unsubscribe(channel, subscriber)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 
 @bp.route('/notifications/<int:id>/delete', methods=['POST'])
@@ -144,8 +328,9 @@ def read_notification():
     """Marks notification as read.
 
     Marks notification as read. If path parameter 'id' is provided, only mark that
-    notification as read. Otherwise, mark all notifications created before the
-    timestamp indicating by 'before' path parameter as read.
+    notification as read. Otherwise, mark all unread notifications created before the
+    timestamp indicating by 'before' path parameter, or whose ids are listed in
+    'ids', as read with one statement.
 
     Produces:
         application/json
@@ -157,13 +342,17 @@ def read_notification():
             type: int
             description: The notification's id.
         before:
-            in: json
+            in: path
             type: float
             description: A unix timestamp.
+        ids:
+            in: json
+            type: array
+            description: Ids of the notifications to be marked.
 
     Responses:
         200:
-            description: Operation success.
+            description: Operation success, with the number of notifications marked.
         400:
             description: Bad request.
         403:
@@ -180,15 +369,18 @@ def read_notification():
         if notification.is_read:
             raise ValidationError('You have already marked this notification as read.')
         notification.is_read = True
+        count = 1
     else:
         before = request.args.get('before', type=float)
-        if before is None:
+        body = request.get_json(silent=True) or {}
+        ids = body.get('ids')
+        if before is None and ids is None:
             abort(400)
-        notifications = current_user.notifications.filter(
-            Notification.timestamp <= before, Notification.is_read == False  # noqa
-        )
-        for notification in notifications:
-            notification.is_read = True
+        if ids is not None and (
+            not isinstance(ids, list) or not all(isinstance(id, int) for id in ids)
+        ):
+            abort(400)
+        count = Notification.mark_as_read(current_user.id, before, ids)
 
     db.session.commit()
-    return {'success': True}
+    return {'success': True, 'count': count}
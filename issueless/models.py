@@ -1,14 +1,57 @@
 from hashlib import md5
-import json
+import re
 from time import time
 
+from flask import url_for
 from flask_login import current_user, UserMixin
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import (
+    aggregate_order_by,
+    array_agg,
+    insert as pg_insert,
+    JSONB,
+)
 from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import validates
+
+from issueless import events
 
 
 db = SQLAlchemy()
 
+# Map each role's name to its id, and each role's id to its permissions. Roles never
+# change at runtime, so every worker loads them once. See Role.refresh_registry().
+_role_ids = {}
+_role_permissions = {}
+
+# Maps a user's id to (expiry, display data) for the actors of notifications, see
+# User.get_actors(). Entries expire quickly so profile changes show up soon.
+_actor_cache = {}
+ACTOR_CACHE_SIZE = 1024
+ACTOR_CACHE_TTL = 60
+
+# A user can be a member of at most MAX_PROJECTS projects, and a project can have at
+# most MAX_MEMBERS members. Enforced on the counters by User.add_project().
+MAX_PROJECTS = 8
+MAX_MEMBERS = 30
+PROJECT_LIMIT_ERROR = (
+    'You can only have 8 or less projects. Please leave one existing project before '
+    'you add any more.'
+)
+MEMBER_LIMIT_ERROR = 'The project does not have any remaining spot.'
+
+# A user keeps their newest MAX_NOTIFICATIONS notifications, older ones are trimmed by
+# the notifications table's triggers. See _notification_triggers.
+MAX_NOTIFICATIONS = 50
+
+# A new notification with one of these names updates the user's unread notification
+# with the same name and target in place, instead of being added next to it.
+COALESCED_NOTIFICATIONS = ('new comment',)
+# A new notification with one of these names replaces the user's notification with
+# the same name and target, read or not.
+REPLACED_NOTIFICATIONS = ('invitation',)
+
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -20,9 +63,25 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(15), unique=True, nullable=False)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
+    # The md5 of the lowercased email, kept in sync by _set_avatar_hash().
+    avatar_hash = db.Column(db.String(32), index=True, nullable=False)
+    # The number of the user's memberships, see add_project() and UserProject.remove().
+    project_count = db.Column(db.Integer, server_default='0', nullable=False)
+    # Incremented whenever the user's notifications change, used as their ETag. These
+    # and the counts below are kept by the notifications table's triggers.
+    notification_version = db.Column(db.Integer, server_default='0', nullable=False)
+    notification_count = db.Column(db.Integer, server_default='0', nullable=False)
+    unread_notification_count = db.Column(
+        db.Integer, server_default='0', nullable=False
+    )
 
     projects = association_proxy('user_projects', 'project')
-    notifications = db.relationship('Notification', backref='user', lazy='dynamic')
+    notifications = db.relationship(
+        'Notification',
+        backref='user',
+        lazy='dynamic',
+        foreign_keys='Notification.user_id',
+    )
     created_issues = db.relationship(
         'Issue',
         backref='creator',
@@ -44,14 +103,36 @@ class User(UserMixin, db.Model):
     def add_project(self, project, role_name):
         """Adds the input project with input role under current user.
 
+        The user's project count and the project's member count are incremented by
+        updates which only match while they are under their limits. The updated rows
+        stay locked until the transaction ends, so concurrent joins can not both take
+        the last spot.
+
         Args:
             project: A project to be added.
             role_name: A role's name the user should have in project.
+
+        Returns:
+            An error message if the user or the project has reached its limit, in
+            which case nothing is added. None otherwise.
         """
 
-        role = Role.query.filter_by(name=role_name).first()
-        user_project = UserProject(user=self, project=project, role=role)
+        if not _increment_count(self, User.project_count, MAX_PROJECTS):
+            return PROJECT_LIMIT_ERROR
+        if not _increment_count(project, Project.member_count, MAX_MEMBERS):
+            _decrement_counts(User, [self.id], User.project_count)
+            return MEMBER_LIMIT_ERROR
+
+        user_project = UserProject(
+            user=self, project=project, role_id=Role.get_id(role_name)
+        )
         db.session.add(user_project)
+        return None
+
+    @validates('email')
+    def _set_avatar_hash(self, key, email):
+        self.avatar_hash = md5(email.lower().encode()).hexdigest()
+        return email
 
     def avatar(self):
         """Generates the avatar link for user.
@@ -60,14 +141,21 @@ class User(UserMixin, db.Model):
             A string of the avatar url.
         """
 
-        digest = md5(self.email.lower().encode()).hexdigest()
-        return f'https://www.gravatar.com/avatar/{digest}?d=identicon&s=68'
+        return User.avatar_url(self.avatar_hash)
+
+    @staticmethod
+    def avatar_url(avatar_hash):
+        """Generates the avatar link for a user's avatar hash."""
+        return url_for('main.avatar', avatar_hash=avatar_hash)
 
     def add_notification(self, name, data, target_id=None):
         """Adds a new notification.
 
-        Adds a new notification. Deletes the oldest notification if adding the new one
-        would make user's notification count exceed 50.
+        Adds a new notification with a plain insert. The user's counts and version
+        are updated, and the user is trimmed if they have too many notifications, by
+        the insert's triggers. Current user is recorded as the notification's actor.
+        Notifications in COALESCED_NOTIFICATIONS or REPLACED_NOTIFICATIONS are
+        upserted by Notification.fan_out() instead.
 
         Args:
             name: A notification's name to be added.
@@ -75,38 +163,94 @@ class User(UserMixin, db.Model):
             target_id: An id representing what instance is Notification about.
         """
 
-        if name == 'invitation':
-            notification = self.notifications.filter(
-                Notification.name == name, Notification.target_id == target_id
-            ).first()
-            # If user has already received the invitation, delete it before
-            # replacing it with the new one.
-            if notification is not None:
-                db.session.delete(notification)
-
-        if self.notifications.count() >= 50:
-            db.session.delete(
-                self.notifications.order_by(Notification.timestamp).first()
-            )
+        if name in COALESCED_NOTIFICATIONS or name in REPLACED_NOTIFICATIONS:
+            Notification.fan_out([self.id], name, data, target_id)
+            return
 
         new_notification = Notification(
-            name=name, payload_json=json.dumps(data), target_id=target_id, user=self
+            name=name,
+            payload_json=data,
+            target_id=target_id,
+            user=self,
+            actor_id=getattr(current_user, 'id', None),
         )
         db.session.add(new_notification)
+        db.session.info.setdefault('notification_recipients', set()).add(self)
 
     def add_basic_notification(self, name, title):
-        self.add_notification(
-            name,
-            {
-                'avatar': current_user.avatar(),
-                'fullname': current_user.fullname(),
-                'projectTitle': title,
-            },
-        )
+        self.add_notification(name, {'projectTitle': title})
+
+    @staticmethod
+    def search(term):
+        """Searches users whose username or full name starts with a term.
+
+        Both are matched case-insensitively, with LIKE on the lowercased expressions
+        of the ix_users_username_key and ix_users_full_name_key indexes.
+
+        Args:
+            term: The start of a username or a full name.
+
+        Returns:
+            A query of the matched users ordered by full name.
+        """
+
+        escaped = re.sub(r'([\\%_])', r'\\\1', term.lower())
+        pattern = f'{escaped}%'
+        return User.query.filter(
+            _username_key.like(pattern, escape='\\')
+            | _full_name_key.like(pattern, escape='\\')
+        ).order_by(_full_name_key)
 
     def fullname(self):
         return f'{self.first_name} {self.last_name}'
 
+    def actor(self):
+        """Returns the display data of the user as a notification's actor."""
+        return {'fullname': self.fullname(), 'avatar': self.avatar()}
+
+    @staticmethod
+    def get_actors(user_ids):
+        """Gets the display data of notifications' actors.
+
+        Users missing from the cache are loaded with one query, which only reads the
+        columns that are displayed.
+
+        Args:
+            user_ids: Ids of the actors. None is ignored.
+
+        Returns:
+            A dict mapping each existing user's id to its display data.
+        """
+
+        now = time()
+        actors = {}
+        missing = []
+        for user_id in set(user_ids):
+            if user_id is None:
+                continue
+            cached = _actor_cache.get(user_id)
+            if cached is not None and cached[0] > now:
+                actors[user_id] = cached[1]
+            else:
+                missing.append(user_id)
+
+        if missing:
+            if len(_actor_cache) + len(missing) > ACTOR_CACHE_SIZE:
+                _actor_cache.clear()
+            users = db.session.query(
+                User.id, User.first_name, User.last_name, User.avatar_hash
+            ).filter(User.id.in_(missing))
+            for user_id, first_name, last_name, avatar_hash in users:
+                actors[user_id] = {
+                    'fullname': f'{first_name} {last_name}',
+                    'avatar': User.avatar_url(avatar_hash),
+                }
+                _actor_cache[user_id] = (now + ACTOR_CACHE_TTL, actors[user_id])
+        return actors
+
+    def notification_etag(self):
+        return f'{self.id}.{self.notification_version}'
+
     @staticmethod
     def _insert_test_users():
         project = Project.query.filter_by(title='Issueless').first()
@@ -118,16 +262,33 @@ class User(UserMixin, db.Model):
                 last_name=f'lastname{i}',
                 username=f'username{i}',
             )
+            db.session.add(user)
 
             if i < 10:
                 user.add_project(project, 'Reviewer')
             elif i < 20:
                 user.add_project(project, 'Developer')
-
-            db.session.add(user)
         db.session.commit()
 
 
+# The lowercased keys which User.search() matches by prefix. text_pattern_ops lets
+# their indexes serve LIKE 'term%' whatever the database's collation is.
+_username_key = db.func.lower(User.username)
+_full_name_key = db.func.lower(
+    User.first_name + db.literal_column("' '") + User.last_name
+)
+db.Index(
+    'ix_users_username_key',
+    _username_key.label('username_key'),
+    postgresql_ops={'username_key': 'text_pattern_ops'},
+)
+db.Index(
+    'ix_users_full_name_key',
+    _full_name_key.label('full_name_key'),
+    postgresql_ops={'full_name_key': 'text_pattern_ops'},
+)
+
+
 class UserProject(db.Model):
     __tablename__ = 'user_projects'
 
@@ -156,17 +317,32 @@ class UserProject(db.Model):
         )
 
     def can(self, permission):
-        return self.role and self.role.has_permission(permission)
+        """Checks the role's permission with the role registry, without loading it."""
+        permissions = Role.get_permissions(self.role_id)
+        return permissions is not None and permissions & permission == permission
 
     def change_role(self):
-        reviewer = Role.query.filter_by(name='Reviewer').first()
-        developer = Role.query.filter_by(name='Developer').first()
-        if self.role == reviewer:
-            new_role = developer
-        elif self.role == developer:
-            new_role = reviewer
-        self.role = new_role
-        return new_role
+        """Switches the role between Reviewer and Developer.
+
+        The loaded role is expired, so it is reloaded from the new role id.
+
+        Returns:
+            The new role's name.
+        """
+
+        if self.role_id == Role.get_id('Reviewer'):
+            new_role_name = 'Developer'
+        elif self.role_id == Role.get_id('Developer'):
+            new_role_name = 'Reviewer'
+        self.role_id = Role.get_id(new_role_name)
+        db.session.expire(self, ['role'])
+        return new_role_name
+
+    def remove(self):
+        """Deletes the membership and decrements the counts of both sides."""
+        db.session.delete(self)
+        _decrement_counts(User, [self.user_id], User.project_count)
+        _decrement_counts(Project, [self.project_id], Project.member_count)
 
 
 class Project(db.Model):
@@ -175,6 +351,11 @@ class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(80), nullable=False)
     description = db.Column(db.String(200), nullable=False)
+    # The number of the project's members, see User.add_project().
+    member_count = db.Column(db.Integer, server_default='0', nullable=False)
+    # Bumped whenever the project, its issues or its members change, see
+    # _touch_projects(). Rendered boards are cached by it.
+    version = db.Column(db.Integer, server_default='0', nullable=False)
 
     users = association_proxy('user_projects', 'user')
     issues = db.relationship(
@@ -184,23 +365,134 @@ class Project(db.Model):
     def __repr__(self):
         return f'< Project {self.title}, {self.description} >'
 
+    def delete(self):
+        """Deletes the project and decrements the project count of every member."""
+        member_ids = db.session.query(UserProject.user_id).filter_by(project_id=self.id)
+        _decrement_counts(User, member_ids, User.project_count)
+        db.session.delete(self)
+
     def get_admin(self):
         """Gets the admin user in the project."""
-        return (
-            self.user_projects.filter_by(
-                role=Role.query.filter_by(name='Admin').first()
+        return self.user_projects.filter_by(role_id=Role.get_id('Admin')).first().user
+
+    def has_member(self, user_id):
+        """Checks if a user is a member with one EXISTS on the membership's key."""
+        return db.session.query(
+            UserProject.query.filter_by(user_id=user_id, project_id=self.id).exists()
+        ).scalar()
+
+    def get_member_ids(self):
+        """Gets the ids of all members without loading the users."""
+        user_ids = self.user_projects.with_entities(UserProject.user_id)
+        return [user_id for user_id, in user_ids]
+
+    def get_admin_reviewer_ids(self):
+        """Gets the ids of the admin and reviewers without loading the users."""
+        user_ids = self.user_projects.filter(
+            UserProject.role_id.in_([Role.get_id('Admin'), Role.get_id('Reviewer')])
+        ).with_entities(UserProject.user_id)
+        return [user_id for user_id, in user_ids]
+
+    def get_issue_board(self):
+        """Gets all issues in the project grouped by status.
+
+        Loads every issue of the project with one query, together with their creators
+        and assignees, and splits them into buckets in Python. In Progress issues are
+        ordered by priority, then by creation time.
+
+        Returns:
+            A dict mapping each status to a list of issues.
+        """
+
+        priority_rank = db.case(
+            [(Issue.priority == 'High', 0), (Issue.priority == 'Medium', 1)], else_=2
+        )
+        issues = self.issues.options(
+            db.joinedload(Issue.creator), db.joinedload(Issue.assignee)
+        ).order_by(priority_rank, Issue.timestamp)
+
+        board = {'Open': [], 'In Progress': [], 'Resolved': [], 'Closed': []}
+        for issue in issues:
+            board[issue.status].append(issue)
+        # Issues resolved or closed before the timestamp columns were added have no
+        # timestamps, keep them last like Postgres orders NULLs.
+        board['Resolved'].sort(
+            key=lambda issue: (
+                issue.resolved_timestamp is None,
+                issue.resolved_timestamp or 0,
             )
-            .first()
-            .user
         )
+        board['Closed'].sort(
+            key=lambda issue: (
+                issue.closed_timestamp is None,
+                issue.closed_timestamp or 0,
+            )
+        )
+        return board
 
-    def get_admin_reviewers(self):
-        user_projects = self.user_projects.filter(
-            (UserProject.role == Role.query.filter_by(name='Admin').first())
-            | (UserProject.role == Role.query.filter_by(name='Reviewer').first())
+    @staticmethod
+    def get_top_members(project_ids, limit):
+        """Gets the earliest members of several projects with one query.
+
+        Members are ranked and counted per project with window functions, so only
+        the first 'limit' members of each project are loaded.
+
+        Args:
+            project_ids: Ids of the projects.
+            limit: The number of members loaded per project.
+
+        Returns:
+            A dict mapping each project's id to a (member count, users) tuple, users
+            being ordered by the time they joined.
+        """
+
+        ranked = (
+            db.session.query(
+                UserProject.project_id,
+                UserProject.user_id,
+                db.func.row_number()
+                .over(
+                    partition_by=UserProject.project_id, order_by=UserProject.timestamp,
+                )
+                .label('rank'),
+                db.func.count()
+                .over(partition_by=UserProject.project_id)
+                .label('count'),
+            )
+            .filter(UserProject.project_id.in_(project_ids))
+            .subquery()
         )
+        rows = (
+            db.session.query(ranked.c.project_id, ranked.c.count, User)
+            .join(User, User.id == ranked.c.user_id)
+            .filter(ranked.c.rank <= limit)
+            .order_by(ranked.c.project_id, ranked.c.rank)
+        )
+
+        members = {}
+        for project_id, count, user in rows:
+            members.setdefault(project_id, (count, []))[1].append(user)
+        return members
 
-        return [user_project.user for user_project in user_projects]
+    @staticmethod
+    def get_issue_counts(project_ids):
+        """Counts the issues of several projects by status with one query.
+
+        Returns:
+            A dict mapping each project's id to a dict mapping statuses to counts.
+            Statuses without issues are left out.
+        """
+
+        rows = (
+            db.session.query(Issue.project_id, Issue.status, db.func.count())
+            .filter(Issue.project_id.in_(project_ids))
+            .group_by(Issue.project_id, Issue.status)
+        )
+
+        counts = {}
+        for project_id, status, count in rows:
+            counts.setdefault(project_id, {})[status] = count
+        return counts
 
 
 class Permission(object):
@@ -244,6 +536,28 @@ class Role(db.Model):
     def reset_permissions(self):
         self.permissions = 0
 
+    @staticmethod
+    def refresh_registry():
+        """Reloads every role's id and permissions into the in-process registry."""
+        global _role_ids, _role_permissions
+        roles = Role.query.all()
+        _role_ids = {role.name: role.id for role in roles}
+        _role_permissions = {role.id: role.permissions for role in roles}
+
+    @staticmethod
+    def get_id(name):
+        """Gets a role's id by name, None if the role does not exist."""
+        if not _role_ids:
+            Role.refresh_registry()
+        return _role_ids.get(name)
+
+    @staticmethod
+    def get_permissions(role_id):
+        """Gets a role's permissions by id, None if the role does not exist."""
+        if not _role_permissions:
+            Role.refresh_registry()
+        return _role_permissions.get(role_id)
+
     @staticmethod
     def insert_roles():
         """Inserts roles into databse with their specific permissions."""
@@ -278,7 +592,6 @@ class Role(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
-    __table_args__ = (db.Index('timestamp', 'is_read'),)
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(), index=True, nullable=False)
@@ -286,9 +599,13 @@ class Notification(db.Model):
         db.Integer
     )  # Representing what instance is the notification about
     timestamp = db.Column(db.Float, index=True, default=time, nullable=False)
-    payload_json = db.Column(db.Text)
+    payload_json = db.Column(JSONB)
     is_read = db.Column(db.Boolean, default=False, nullable=False)
+    # How many times the notification has been coalesced, see fan_out().
+    occurrences = db.Column(db.Integer, default=1, server_default='1', nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # The user whose action caused the notification.
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'))
 
     def __repr__(self):
         return (
@@ -297,18 +614,474 @@ class Notification(db.Model):
         )
 
     def get_data(self):
-        return json.loads(str(self.payload_json))
+        return self.payload_json
 
     def to_dict(self):
         return {
             'notificationId': self.id,
             'name': self.name,
             'targetId': self.target_id,
+            'actorId': self.actor_id,
             'data': self.get_data(),
             'timestamp': self.timestamp,
             "isRead": self.is_read,
+            'occurrences': self.occurrences,
         }
 
+    @staticmethod
+    def json_object():
+        """Builds the same JSON object as to_dict() in the database."""
+        return db.func.json_build_object(
+            'notificationId',
+            Notification.id,
+            'name',
+            Notification.name,
+            'targetId',
+            Notification.target_id,
+            'actorId',
+            Notification.actor_id,
+            'data',
+            Notification.payload_json,
+            'timestamp',
+            Notification.timestamp,
+            'isRead',
+            Notification.is_read,
+            'occurrences',
+            Notification.occurrences,
+        )
+
+    @staticmethod
+    def query_json(user_id, since=None):
+        """Queries a user's notifications serialized by the database.
+
+        Args:
+            user_id: The user's id.
+            since: If provided, only queries notifications created after this unix
+                timestamp, oldest first. Otherwise queries all notifications, newest
+                first.
+
+        Returns:
+            A query of (timestamp, actor id, JSON text) rows.
+        """
+
+        notifications = db.session.query(
+            Notification.timestamp,
+            Notification.actor_id,
+            db.cast(Notification.json_object(), db.Text),
+        ).filter(Notification.user_id == user_id)
+        if since is None:
+            return notifications.order_by(Notification.timestamp.desc())
+        return notifications.filter(Notification.timestamp > since).order_by(
+            Notification.timestamp
+        )
+
+    @staticmethod
+    def json_array(user_id, since=None, before=None, limit=None):
+        """Serializes a user's notifications into a JSON array in the database.
+
+        The payloads are never decoded in Python, the array is aggregated by Postgres
+        and returned as text. Notifications are paginated by their (timestamp, id),
+        newest first, which is served by the user's notification index.
+
+        Args:
+            user_id: The user's id.
+            since: If provided, only serializes notifications created after this
+                unix timestamp, oldest first. Otherwise serializes notifications
+                newest first.
+            before: A (timestamp, id) cursor. If provided, only serializes
+                notifications older than the one it points to.
+            limit: If provided, serializes at most this many notifications.
+
+        Returns:
+            A tuple of the JSON array's string, a list of the notifications' actor
+            ids, the number of notifications and the (timestamp, id) cursor of the
+            oldest one, which is None if the array is empty.
+        """
+
+        page = db.session.query(Notification.id).filter(Notification.user_id == user_id)
+        if since is not None:
+            page = page.filter(Notification.timestamp > since)
+            order = (Notification.timestamp, Notification.id)
+        else:
+            if before is not None:
+                page = page.filter(
+                    db.tuple_(Notification.timestamp, Notification.id)
+                    < db.tuple_(*before)
+                )
+            order = (Notification.timestamp.desc(), Notification.id.desc())
+        page = page.order_by(*order).limit(limit)
+
+        oldest_first = (Notification.timestamp, Notification.id)
+        notifications_json, actor_ids, count, timestamp, id = (
+            db.session.query(
+                db.func.coalesce(
+                    db.cast(
+                        db.func.json_agg(
+                            aggregate_order_by(Notification.json_object(), *order)
+                        ),
+                        db.Text,
+                    ),
+                    '[]',
+                ),
+                db.func.array_agg(db.distinct(Notification.actor_id)),
+                db.func.count(Notification.id),
+                array_agg(aggregate_order_by(Notification.timestamp, *oldest_first))[1],
+                array_agg(aggregate_order_by(Notification.id, *oldest_first))[1],
+            )
+            .filter(Notification.id.in_(page.subquery()))
+            .one()
+        )
+        cursor = None if id is None else (timestamp, id)
+        return notifications_json, actor_ids or [], count, cursor
+
+    @staticmethod
+    def mark_as_read(user_id, before=None, ids=None):
+        """Marks a user's unread notifications as read with one statement.
+
+        Args:
+            user_id: The user's id.
+            before: If provided, only marks notifications created at or before this
+                unix timestamp.
+            ids: If provided, only marks notifications with these ids.
+
+        Returns:
+            The number of notifications marked as read.
+        """
+
+        notifications = Notification.query.filter(
+            Notification.user_id == user_id, Notification.is_read == False  # noqa
+        )
+        if before is not None:
+            notifications = notifications.filter(Notification.timestamp <= before)
+        if ids is not None:
+            notifications = notifications.filter(Notification.id.in_(ids))
+        return notifications.update(
+            {Notification.is_read: True}, synchronize_session=False
+        )
+
+    @staticmethod
+    def fan_out(user_ids, name, data, target_id=None, actor_id=None):
+        """Adds the same notification to many users.
+
+        Writes the notifications for all recipients with one multi-row insert, whose
+        triggers update and trim the recipients. Current user is recorded as the
+        notifications' actor unless another one is provided.
+
+        A notification in COALESCED_NOTIFICATIONS is upserted instead. A recipient
+        who has not read the previous one with the same name and target gets that
+        row updated with the new data, actor and timestamp, and its occurrences
+        incremented. A notification in REPLACED_NOTIFICATIONS is upserted too, the
+        previous one is updated and marked as unread whether it was read or not.
+
+        Args:
+            user_ids: Ids of the users to be notified.
+            name: A notification's name to be added.
+            data: A notification data to be added.
+            target_id: An id representing what instance is Notification about.
+            actor_id: The id of the user who caused the notification.
+        """
+
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+
+        timestamp = time()
+        if actor_id is None:
+            actor_id = getattr(current_user, 'id', None)
+        insert = pg_insert(Notification.__table__).values(
+            [
+                {
+                    'name': name,
+                    'target_id': target_id,
+                    'timestamp': timestamp,
+                    'payload_json': data,
+                    'is_read': False,
+                    'occurrences': 1,
+                    'user_id': user_id,
+                    'actor_id': actor_id,
+                }
+                for user_id in user_ids
+            ]
+        )
+        if name in COALESCED_NOTIFICATIONS:
+            insert = insert.on_conflict_do_update(
+                index_elements=['user_id', 'name', 'target_id'],
+                index_where=_coalesced_where,
+                set_={
+                    'timestamp': insert.excluded.timestamp,
+                    'payload_json': insert.excluded.payload_json,
+                    'actor_id': insert.excluded.actor_id,
+                    'occurrences': Notification.occurrences + 1,
+                },
+            )
+        elif name in REPLACED_NOTIFICATIONS:
+            insert = insert.on_conflict_do_update(
+                index_elements=['user_id', 'name', 'target_id'],
+                index_where=_replaced_where,
+                set_={
+                    'timestamp': insert.excluded.timestamp,
+                    'payload_json': insert.excluded.payload_json,
+                    'actor_id': insert.excluded.actor_id,
+                    'is_read': False,
+                    'occurrences': 1,
+                },
+            )
+        db.session.execute(insert)
+        _notify_users(db.session, user_ids)
+
+
+# Serves paginating and trimming a user's notifications, newest first.
+db.Index(
+    'ix_notifications_user_id_timestamp_id',
+    Notification.user_id,
+    Notification.timestamp.desc(),
+    Notification.id.desc(),
+)
+
+# A user has at most one unread notification with a coalesced name per target, which
+# is the conflict target of the upsert in Notification.fan_out().
+_coalesced_where = db.and_(
+    Notification.is_read == False,  # noqa
+    Notification.name.in_(COALESCED_NOTIFICATIONS),
+)
+db.Index(
+    'ix_notifications_coalesced',
+    Notification.user_id,
+    Notification.name,
+    Notification.target_id,
+    unique=True,
+    postgresql_where=_coalesced_where,
+)
+
+# A user has at most one notification with a replaced name per target, which is the
+# conflict target of the upsert in Notification.fan_out().
+_replaced_where = Notification.name.in_(REPLACED_NOTIFICATIONS)
+db.Index(
+    'ix_notifications_replaced',
+    Notification.user_id,
+    Notification.name,
+    Notification.target_id,
+    unique=True,
+    postgresql_where=_replaced_where,
+)
+
+# Keep the users' notification counts and versions with the statements which change
+# their notifications, so no write has to recount them. The triggers run once per
+# statement and update each affected user once, from the statement's transition
+# tables. After an insert, the users who went over MAX_NOTIFICATIONS are trimmed,
+# and that delete updates their counts in turn.
+_notification_triggers = [
+    f"""
+    CREATE OR REPLACE FUNCTION count_inserted_notifications() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET
+            notification_count = notification_count + changes.count,
+            unread_notification_count
+                = unread_notification_count + changes.unread_count,
+            notification_version = notification_version + 1
+        FROM (
+            SELECT
+                user_id,
+                count(*) AS count,
+                count(*) FILTER (WHERE NOT is_read) AS unread_count
+            FROM inserted_notifications
+            GROUP BY user_id
+        ) AS changes
+        WHERE users.id = changes.user_id;
+
+        DELETE FROM notifications WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    notifications.id,
+                    row_number() OVER (
+                        PARTITION BY notifications.user_id
+                        ORDER BY notifications.timestamp DESC, notifications.id DESC
+                    ) AS rank
+                FROM notifications JOIN users ON users.id = notifications.user_id
+                WHERE users.notification_count > {MAX_NOTIFICATIONS}
+                    AND users.id IN (SELECT user_id FROM inserted_notifications)
+            ) AS ranked
+            WHERE rank > {MAX_NOTIFICATIONS}
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION count_updated_notifications() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET
+            unread_notification_count
+                = unread_notification_count + changes.unread_change,
+            notification_version = notification_version + 1
+        FROM (
+            SELECT
+                updated.user_id,
+                sum((NOT updated.is_read)::int - (NOT previous.is_read)::int)
+                    AS unread_change
+            FROM updated_notifications AS updated
+            JOIN replaced_notifications AS previous ON previous.id = updated.id
+            GROUP BY updated.user_id
+        ) AS changes
+        WHERE users.id = changes.user_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION count_deleted_notifications() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET
+            notification_count = notification_count - changes.count,
+            unread_notification_count
+                = unread_notification_count - changes.unread_count,
+            notification_version = notification_version + 1
+        FROM (
+            SELECT
+                user_id,
+                count(*) AS count,
+                count(*) FILTER (WHERE NOT is_read) AS unread_count
+            FROM deleted_notifications
+            GROUP BY user_id
+        ) AS changes
+        WHERE users.id = changes.user_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER count_inserted_notifications AFTER INSERT ON notifications
+    REFERENCING NEW TABLE AS inserted_notifications
+    FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_notifications();
+    """,
+    """
+    CREATE TRIGGER count_updated_notifications AFTER UPDATE ON notifications
+    REFERENCING NEW TABLE AS updated_notifications
+        OLD TABLE AS replaced_notifications
+    FOR EACH STATEMENT EXECUTE FUNCTION count_updated_notifications();
+    """,
+    """
+    CREATE TRIGGER count_deleted_notifications AFTER DELETE ON notifications
+    REFERENCING OLD TABLE AS deleted_notifications
+    FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_notifications();
+    """,
+]
+for statement in _notification_triggers:
+    event.listen(
+        Notification.__table__,
+        'after_create',
+        db.DDL(statement).execute_if(dialect='postgresql'),
+    )
+
+
+@event.listens_for(db.session, 'after_flush')
+def _notify_recipients(session, flush_context):
+    """Wakes up the users whose notifications were added, changed or deleted."""
+
+    users = session.info.pop('notification_recipients', ())
+    user_ids = {user.id for user in users}
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and session.is_modified(obj):
+            user_ids.add(obj.user_id)
+    if user_ids:
+        _notify_users(session, list(user_ids))
+
+
+def _increment_count(obj, column, limit):
+    """Increments a counter column of a user or a project unless it reached limit.
+
+    Returns:
+        True if the counter was incremented.
+    """
+
+    if obj.id is None:
+        # Not inserted yet, so no other transaction can see it.
+        count = getattr(obj, column.key) or 0
+        if count >= limit:
+            return False
+        setattr(obj, column.key, count + 1)
+        return True
+
+    model = type(obj)
+    return (
+        model.query.filter(model.id == obj.id, column < limit).update(
+            {column: column + 1}, synchronize_session=False
+        )
+        == 1
+    )
+
+
+def _decrement_counts(model, ids, column):
+    model.query.filter(model.id.in_(ids)).update(
+        {column: column - 1}, synchronize_session=False
+    )
+
+
+@event.listens_for(db.session, 'after_flush')
+def _touch_projects(session, flush_context):
+    """Bumps the versions of the projects whose board changed in the flush."""
+    project_ids = set()
+    for obj in session.new | session.deleted:
+        project_ids.add(_board_project_id(obj))
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            project_ids.add(_board_project_id(obj))
+    project_ids.discard(None)
+    if project_ids:
+        Project.query.filter(Project.id.in_(project_ids)).update(
+            {Project.version: Project.version + 1}, synchronize_session=False
+        )
+
+
+def _board_project_id(obj):
+    if isinstance(obj, Project):
+        return obj.id
+    if isinstance(obj, (Issue, UserProject)):
+        return obj.project_id
+    return None
+
+
+@event.listens_for(db.session, 'before_commit')
+def _send_events(session):
+    events.send_pending(session)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_events(session):
+    events.publish_pending(session)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_notifications(session, previous_transaction):
+    session.info.pop('notification_recipients', None)
+    events.discard_pending(session)
+
+
+def _notify_users(session, user_ids):
+    """Wakes up the users' notification streams once the session commits."""
+    for user_id in set(user_ids):
+        events.send(session, events.notification_channel(user_id), 'new')
+
+
+class Job(db.Model):
+    # A side effect run by `flask worker` after the request commits, see
+    # issueless.jobs.
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(), nullable=False)
+    args = db.Column(JSONB, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    # When the job is due, None once it has failed too many times.
+    run_at = db.Column(db.Float, index=True, default=time)
+    last_error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'< Job {self.id}, {self.name}, {self.attempts}, {self.run_at} >'
+
 
 class Issue(db.Model):
     __tablename__ = 'issues'
@@ -323,7 +1096,9 @@ class Issue(db.Model):
     closed_timestamp = db.Column(db.Float, index=True)
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     assignee_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    project_id = db.Column(
+        db.Integer, db.ForeignKey('projects.id'), index=True, nullable=False
+    )
 
     files = db.relationship(
         'File', backref='issue', lazy='dynamic', cascade='all, delete-orphan'
@@ -370,3 +1145,7 @@ class Comment(db.Model):
 
     def __repr__(self):
         return f'< Comment {self.id}, {self.user.fullname()}, {self.issue.title} >'
+
+
+# Serves finding the latest comment of an issue, see get_missing_review_issues().
+db.Index('ix_comments_issue_id_timestamp', Comment.issue_id, Comment.timestamp)
@@ -1,7 +1,63 @@
+from flask import current_app, Markup, render_template
 from flask_login import current_user
 
+from issueless.decorators import get_membership
 from issueless.errors.errors import ValidationError
-from issueless.models import Role, User
+from issueless.models import (
+    MAX_MEMBERS,
+    MAX_PROJECTS,
+    MEMBER_LIMIT_ERROR,
+    PROJECT_LIMIT_ERROR,
+    Role,
+    User,
+    UserProject,
+)
+
+BOARD_CACHE_SIZE = 256
+
+
+def render_board(user_project):
+    """Renders a project's board for a member, or gets it from the cache.
+
+    The board only depends on the project's state and the member's role, so it is
+    rendered once per project version and role. Any change to the project, its issues
+    or its members bumps the version, so a cached board is never stale. The cache is
+    kept per application and cleared once it holds BOARD_CACHE_SIZE boards.
+
+    Args:
+        user_project: Current user's membership of the project.
+
+    Returns:
+        The rendered board.
+    """
+
+    project = user_project.project
+    role = user_project.role.name
+    # The version is read before the issues, so a board is never cached under a
+    # newer version than the state it was rendered from.
+    key = (project.id, project.version, role)
+    cache = current_app.extensions.setdefault('board_cache', {})
+    board = cache.get(key)
+    if board is None:
+        issues = project.get_issue_board()
+        board = Markup(
+            render_template(
+                'project_board.html',
+                project=project,
+                role=role,
+                member_user_projects=project.user_projects.order_by(
+                    UserProject.timestamp
+                ),
+                open_issues=issues['Open'],
+                in_progress_issues=issues['In Progress'],
+                resolved_issues=issues['Resolved'],
+                closed_issues=issues['Closed'],
+            )
+        )
+        if len(cache) >= BOARD_CACHE_SIZE:
+            cache.clear()
+        cache[key] = board
+    return board
 
 
 def create_validation(title, description):
@@ -16,11 +72,8 @@ def create_validation(title, description):
     """
 
     error = title_description_validation(title, description)
-    if error is None and current_user.user_projects.count() >= 8:
-        error = (
-            'You can only have 8 or less projects. Please leave one existing '
-            'project before you add any more.'
-        )
+    if error is None and current_user.project_count >= MAX_PROJECTS:
+        error = PROJECT_LIMIT_ERROR
     return error
 
 
@@ -74,18 +127,17 @@ def invite_validation(project, target, role_name):
     """
 
     user = User.query.filter((User.username == target) | (User.email == target)).first()
-    role = Role.query.filter_by(name=role_name).first()
 
-    if role is None or role.name == 'Admin':
+    if Role.get_id(role_name) is None or role_name == 'Admin':
         raise ValidationError('Please provide a valid role.')
 
     if user is not None:
         error = None
         if user == current_user:
             error = 'You can not invite yourself to your project.'
-        elif user in project.users:
+        elif project.has_member(user.id):
             error = 'User is already a member of the project.'
-        elif project.user_projects.count() >= 30:
+        elif project.member_count >= MAX_MEMBERS:
             error = 'You can only have 30 or less members in one project.'
         if error is not None:
             raise ValidationError(error)
@@ -106,13 +158,10 @@ def join_validation(project):
 
     if project is None:
         raise ValidationError('The project has been removed.')
-    if current_user.user_projects.count() >= 8:
-        raise ValidationError(
-            'You can only have 8 or less projects. Please leave one existing project '
-            'before you add any more.'
-        )
-    elif project.user_projects.count() >= 30:
-        raise ValidationError('The project does not have any remaining spot.')
+    if current_user.project_count >= MAX_PROJECTS:
+        raise ValidationError(PROJECT_LIMIT_ERROR)
+    elif project.member_count >= MAX_MEMBERS:
+        raise ValidationError(MEMBER_LIMIT_ERROR)
 
 
 def remove_member_validation(project, user):
@@ -148,7 +197,11 @@ def change_role_validation(project, user):
 
 
 def _member_validation(project, user, not_member_msg, is_current_user_msg):
-    user_project = project.user_projects.filter_by(user=user).first()
+    if user == current_user:
+        # Memoized by the permission decorator, so it is not queried again.
+        user_project = get_membership(project.id)[1]
+    else:
+        user_project = project.user_projects.filter_by(user=user).first()
     if user_project is None:
         raise ValidationError(not_member_msg)
     if user == current_user:
@@ -1,8 +1,11 @@
 from flask import abort, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
-from issueless.decorators import permission_required
-from issueless.models import db, Issue, Permission, Project, User, UserProject
+from issueless import jobs
+from issueless import user_index
+from issueless.decorators import clear_memberships, permission_required
+from issueless.errors.errors import ValidationError
+from issueless.models import db, Permission, Project, User, UserProject
 from issueless.project import bp
 from issueless.project.helpers import (
     change_role_validation,
@@ -11,6 +14,7 @@ from issueless.project.helpers import (
     invite_validation,
     join_validation,
     remove_member_validation,
+    render_board,
 )
 
 
@@ -19,33 +23,11 @@ from issueless.project.helpers import (
 @permission_required(Permission.READ_PROJECT)
 def project(user_project):
     """Renders the project page."""
-    project = user_project.project
     return render_template(
         'project.html',
-        title=project.title,
+        title=user_project.project.title,
         current_user_project=user_project,
-        member_user_projects=project.user_projects.order_by(UserProject.timestamp),
-        open_issues=project.issues.filter_by(status='Open').order_by(Issue.timestamp),
-        in_progress_issues=project.issues.filter_by(
-            status='In Progress', priority='High'
-        )
-        .order_by(Issue.timestamp)
-        .union_all(
-            project.issues.filter_by(status='In Progress', priority='Medium').order_by(
-                Issue.timestamp
-            )
-        )
-        .union_all(
-            project.issues.filter_by(status='In Progress', priority='Low').order_by(
-                Issue.timestamp
-            )
-        ),
-        resolved_issues=project.issues.filter_by(status='Resolved').order_by(
-            Issue.resolved_timestamp
-        ),
-        closed_issues=project.issues.filter_by(status='Closed').order_by(
-            Issue.closed_timestamp
-        ),
+        board=render_board(user_project),
     )
 
 
@@ -73,11 +55,13 @@ def create():
     description = request.form.get('description')
 
     error = create_validation(title, description)
+    if error is None:
+        project = Project(title=title, description=description)
+        error = current_user.add_project(project, 'Admin')
     if error is not None:
+        db.session.rollback()
         flash(error)
     else:
-        project = Project(title=title, description=description)
-        current_user.add_project(project, 'Admin')
         db.session.commit()
 
     return redirect(url_for('index'))
@@ -164,11 +148,20 @@ def delete(user_project):
     """
 
     project = user_project.project
-    for user in project.users:
-        if user != current_user:
-            user.add_basic_notification('delete project', project.title)
+    jobs.enqueue(
+        'fan out notification',
+        user_ids=[
+            user_id
+            for user_id in project.get_member_ids()
+            if user_id != current_user.id
+        ],
+        name='delete project',
+        data={'projectTitle': project.title},
+        target_id=None,
+        actor_id=current_user.id,
+    )
 
-    db.session.delete(project)
+    project.delete()
     db.session.commit()
 
     return redirect(url_for('index'))
@@ -241,8 +234,6 @@ def invite(user_project):
         user = invite_validation(project, target, role_name)
         if user is not None:
             data = {
-                'avatar': current_user.avatar(),
-                'fullname': current_user.fullname(),
                 'projectTitle': project.title,
                 'roleName': role_name,
             }
@@ -256,17 +247,25 @@ def invite(user_project):
         return {'success': True, 'users': []}
     if search_term[-1] == ' ':
         search_term = search_term[:-1]
-    ilike_regex = f'{search_term}%'
 
+    # The in-memory index, if enabled, only finds the users. Whether each of them is a
+    # member is always answered by the query itself.
+    user_ids = user_index.search(search_term, 10)
+    if user_ids is None:
+        users = User.search(search_term)
+    else:
+        users = User.query.filter(User.id.in_(user_ids))
     users = (
-        User.query.filter(
-            User.username.ilike(ilike_regex)
-            | db.func.concat(User.first_name, ' ', User.last_name).ilike(ilike_regex)
+        users.outerjoin(
+            UserProject,
+            (UserProject.user_id == User.id) & (UserProject.project_id == project.id),
         )
-        .order_by(db.func.concat(User.first_name, ' ', User.last_name))
+        .add_columns(UserProject.project_id.isnot(None))
         .limit(10)
         .all()
     )
+    if user_ids is not None:
+        users.sort(key=lambda row: user_ids.index(row[0].id))
 
     return {
         'success': True,
@@ -275,9 +274,9 @@ def invite(user_project):
                 'fullname': user.fullname(),
                 'username': user.username,
                 'avatar': user.avatar(),
-                'joined': user in project.users,
+                'joined': joined,
             }
-            for user in users
+            for user, joined in users
         ],
     }
 
@@ -318,7 +317,9 @@ def join(id):
     join_validation(project)
 
     role_name = notification.get_data()['roleName']
-    current_user.add_project(project, role_name)
+    error = current_user.add_project(project, role_name)
+    if error is not None:
+        raise ValidationError(error)
 
     admin = project.get_admin()
     admin.add_basic_notification('join project', project.title)
@@ -355,7 +356,7 @@ def quit(user_project):
     """
 
     project = user_project.project
-    db.session.delete(user_project)
+    user_project.remove()
     project.get_admin().add_basic_notification('quit project', project.title)
     db.session.commit()
 
@@ -409,7 +410,7 @@ def remove_member(user_project):
     user = User.query.get_or_404(user_id)
     user_project = remove_member_validation(project, user)
 
-    db.session.delete(user_project)
+    user_project.remove()
     user.add_basic_notification('remove user', project.title)
     db.session.commit()
 
@@ -459,15 +460,11 @@ def change_role(user_project):
     user = User.query.get_or_404(user_id)
     user_project = change_role_validation(project, user)
 
-    new_role = user_project.change_role()
+    new_role_name = user_project.change_role()
+    # Memoized memberships may hold the old role.
+    clear_memberships()
     user.add_notification(
-        'change role',
-        {
-            'avatar': current_user.avatar(),
-            'fullname': current_user.fullname(),
-            'projectTitle': project.title,
-            'newRole': new_role.name,
-        },
+        'change role', {'projectTitle': project.title, 'newRole': new_role_name}
     )
     db.session.commit()
 
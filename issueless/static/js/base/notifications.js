@@ -1,4 +1,13 @@
 let since;
+let etag;
+// Display data of notifications' actors, keyed by user id.
+const actors = {};
+// The list is only loaded the first time the dropdown opens.
+let loaded = false;
+let loading = false;
+// Cursor of the next page of older notifications, null on the last page.
+let nextCursor = null;
+let loadingPage = false;
 const notificationList = document.querySelector(
   '.notification-content .list-group'
 );
@@ -39,207 +48,293 @@ function noNotification() {
   }
 }
 
-function generateNotifications() {
-  function createMediaBody(fullname, message, timestamp) {
-    const mediaBody = document.createElement('div');
-    mediaBody.className = 'ml-2 media-body text-truncate';
-    mediaBody.innerHTML = `
-      <strong class="d-block text-truncate">${fullname}</strong>
-      <span class="d-block text-truncate">
-        ${message}
-      </span>
-      <span class="notification-timestamp">${moment(
-        timestamp * 1000
-      ).fromNow()}</span>
-    `;
-    return mediaBody;
+function createMediaBody(fullname, message, timestamp) {
+  const mediaBody = document.createElement('div');
+  mediaBody.className = 'ml-2 media-body text-truncate';
+  mediaBody.innerHTML = `
+    <strong class="d-block text-truncate">${fullname}</strong>
+    <span class="d-block text-truncate">
+      ${message}
+    </span>
+    <span class="notification-timestamp">${moment(
+      timestamp * 1000
+    ).fromNow()}</span>
+  `;
+  return mediaBody;
+}
+
+function deleteNotification(notificationId, item) {
+  postFetch(`/notifications/${notificationId}/delete`, (data2) => {
+    if (data2.success) {
+      item.remove();
+      noNotification();
+    } else {
+      addAlert(data2.error, 'danger');
+    }
+  });
+}
+
+function addNotification(n, isNew) {
+  const {
+    notificationId,
+    name,
+    targetId,
+    actorId,
+    data,
+    timestamp,
+    isRead,
+    occurrences,
+  } = n;
+  const { fullname, avatar } = actors[actorId] || data;
+
+  // A coalesced notification comes again with a new timestamp, its old item is
+  // replaced.
+  const oldItem = notificationList.querySelector(
+    `[data-notification-id="${notificationId}"]`
+  );
+  if (oldItem) {
+    oldItem.remove();
+  }
+
+  const item = document.createElement('li');
+  item.dataset.notificationId = notificationId;
+
+  item.className = 'list-group-item p-0';
+  if (isRead) {
+    item.classList.add('notification-read');
+  } else {
+    item.classList.add('notification-unread');
   }
 
-  function deleteNotification(notificationId, item) {
-    postFetch(`/notifications/${notificationId}/delete`, (data2) => {
-      if (data2.success) {
+  const media = document.createElement('div');
+  media.className = 'media align-items-center';
+
+  const avatarImg = document.createElement('img');
+  avatarImg.src = avatar;
+  avatarImg.alt = fullname;
+  media.appendChild(avatarImg);
+
+  let messageHTML;
+  if (name === 'invitation') {
+    messageHTML = `invited you to be a <strong>${data.roleName}</strong> in <strong>${data.projectTitle}</strong>.`;
+  } else if (name === 'join project') {
+    messageHTML = `joined your project <strong>${data.projectTitle}</strong>.`;
+  } else if (name === 'delete project') {
+    messageHTML = `deleted <strong>${data.projectTitle}</strong>.`;
+  } else if (name === 'quit project') {
+    messageHTML = `left <strong>${data.projectTitle}</strong>.`;
+  } else if (name === 'remove user') {
+    messageHTML = `removed you from <strong>${data.projectTitle}</strong>.`;
+  } else if (name === 'change role') {
+    messageHTML = `changed your role in <strong>${data.projectTitle}</strong> to <strong>${data.newRole}</strong>.`;
+  } else if (name === 'new issue') {
+    messageHTML = `created a new issue <strong>${data.issueTitle}</strong> in <strong>${data.projectTitle}</strong>.`;
+  } else if (name === 'delete issue') {
+    messageHTML = `deleted the issue <strong>${data.issueTitle}</strong> in <strong>${data.projectTitle}</strong>.`;
+  } else if (name === 'assign issue') {
+    messageHTML = `assigned you a new issue.`;
+  } else if (name === 'remove assignee') {
+    messageHTML = `assigned the issue <strong>${data.issueTitle}</strong> to another member.`;
+  } else if (name === 'mark open') {
+    messageHTML = `marked the closed issue <strong>${data.issueTitle}</strong> as Open.`;
+  } else if (name === 'mark in progress') {
+    messageHTML = `marked the ${data.preStatus} issue <strong>${data.issueTitle}</strong> as In Progress.`;
+  } else if (name === 'mark resolved') {
+    messageHTML = `marked the issue <strong>${data.issueTitle}</strong> as Resolved.`;
+  } else if (name === 'mark closed') {
+    messageHTML = `marked the issue <strong>${data.issueTitle}</strong> as Closed.`;
+  } else if (name === 'new comment') {
+    messageHTML = `submitted a new comment.`;
+    if (occurrences > 1) {
+      messageHTML += ` <strong>${occurrences}</strong> new comments in total.`;
+    }
+  }
+
+  const mediaBody = createMediaBody(fullname, messageHTML, timestamp);
+  media.appendChild(mediaBody);
+
+  if (name === 'invitation') {
+    const btnDiv = document.createElement('div');
+    btnDiv.className = 'd-flex flex-sm-column mr-3';
+    const acceptBtn = document.createElement('button');
+    acceptBtn.className = 'btn btn-outline-secondary btn-sm';
+    acceptBtn.textContent = 'Accept';
+
+    let successFunc;
+    if (window.location.pathname === '/dashboard') {
+      successFunc = () => {
+        window.location.reload(true);
+      };
+    } else {
+      successFunc = () => {
         item.remove();
-        noNotification();
-      } else {
-        addAlert(data2.error, 'danger');
-      }
+      };
+    }
+    acceptBtn.addEventListener('click', function () {
+      postFetch(`/projects/${targetId}/join`, (data2) => {
+        if (data2.success) {
+          successFunc();
+        } else {
+          $('.nav-item .dropdown-toggle').dropdown('hide');
+          const { error } = data2;
+          if (error === 'The project has been removed.') {
+            deleteNotification(notificationId, item);
+          }
+          addAlert(error, 'danger');
+        }
+      });
+    });
+    btnDiv.appendChild(acceptBtn);
+
+    const deleteBtn = document.createElement('button');
+    deleteBtn.className = 'btn btn-outline-secondary btn-sm mt-1';
+    deleteBtn.textContent = 'Delete';
+    deleteBtn.addEventListener('click', function () {
+      deleteNotification(notificationId, item);
+    });
+    btnDiv.appendChild(deleteBtn);
+
+    media.appendChild(btnDiv);
+  } else if (
+    name === 'assign issue' ||
+    name === 'mark in progress' ||
+    name === 'new comment'
+  ) {
+    const redirectIcon = document.createElement('i');
+    redirectIcon.className =
+      'material-icons mx-2 notification-redirect-icon';
+    redirectIcon.textContent = 'navigate_next';
+    redirectIcon.addEventListener('click', function () {
+      window.location.href = `/projects/${data.projectId}/issues/${targetId}`;
+    });
+    media.appendChild(redirectIcon);
+  }
+
+  if (!isRead) {
+    const markAsReadBtn = document.createElement('button');
+    markAsReadBtn.className = 'notification-marker ml-2 btn-primary';
+    markAsReadBtn.setAttribute('data-toggle', 'tooltip');
+    markAsReadBtn.setAttribute('data-placement', 'top');
+    markAsReadBtn.setAttribute('title', 'Mark as Read');
+    media.appendChild(markAsReadBtn);
+
+    markAsReadBtn.addEventListener('click', function () {
+      $(markAsReadBtn).tooltip('hide');
+      postFetch(`/notifications/read?id=${notificationId}`, (data2) => {
+        if (data2.success) {
+          item.classList.remove('notification-unread');
+          item.classList.add('notification-read');
+          markAsReadBtn.remove();
+          noNotification();
+        } else {
+          $('.nav-item .dropdown-toggle').dropdown('hide');
+          addAlert(data2.error, 'danger');
+        }
+      });
     });
   }
 
+  item.appendChild(media);
+  if (isNew) {
+    notificationList.prepend(item);
+  } else {
+    notificationList.appendChild(item);
+  }
+}
+
+// Sends the ETag of the last response, the server answers 304 Not Modified without
+// a body if none of the notifications has changed since then.
+function conditionalGetFetch(url, okFunc) {
+  const headers = {};
+  if (etag) {
+    headers['If-None-Match'] = etag;
+  }
+  fetch(url, { redirect: 'error', cache: 'no-store', headers })
+    .then((resp) => {
+      if (resp.status === 304) {
+        return;
+      }
+      etag = resp.headers.get('ETag');
+      thenFunc(resp, okFunc);
+    })
+    .catch((error) => {
+      if (error.message === 'Failed to fetch') {
+        window.location.href = '/auth/login';
+      }
+    });
+}
+
+function generateNotifications() {
   let url = '/notifications';
   if (since) {
     url = `/notifications?since=${since}`;
   }
-  getFetch(url, (json) => {
+  conditionalGetFetch(url, (json) => {
     if (json.success) {
       const { notifications } = json;
+      Object.assign(actors, json.actors);
 
       for (let i = 0; i < notifications.length; i += 1) {
         const n = notifications[i];
-        const {
-          notificationId,
-          name,
-          targetId,
-          data,
-          data: { fullname, avatar },
-          timestamp,
-          isRead,
-        } = n;
-
         if (
           (!since && i === 0) ||
           (url.includes('since') && i === notifications.length - 1)
         ) {
-          since = timestamp;
+          since = n.timestamp;
         }
+        addNotification(n, url.includes('since'));
+      }
+      if (!url.includes('since')) {
+        nextCursor = json.next;
+      }
 
-        const item = document.createElement('li');
-
-        item.className = 'list-group-item p-0';
-        if (isRead) {
-          item.classList.add('notification-read');
-        } else {
-          item.classList.add('notification-unread');
-        }
-
-        const media = document.createElement('div');
-        media.className = 'media align-items-center';
-
-        const avatarImg = document.createElement('img');
-        avatarImg.src = avatar;
-        avatarImg.alt = fullname;
-        media.appendChild(avatarImg);
-
-        let messageHTML;
-        if (name === 'invitation') {
-          messageHTML = `invited you to be a <strong>${data.roleName}</strong> in <strong>${data.projectTitle}</strong>.`;
-        } else if (name === 'join project') {
-          messageHTML = `joined your project <strong>${data.projectTitle}</strong>.`;
-        } else if (name === 'delete project') {
-          messageHTML = `deleted <strong>${data.projectTitle}</strong>.`;
-        } else if (name === 'quit project') {
-          messageHTML = `left <strong>${data.projectTitle}</strong>.`;
-        } else if (name === 'remove user') {
-          messageHTML = `removed you from <strong>${data.projectTitle}</strong>.`;
-        } else if (name === 'change role') {
-          messageHTML = `changed your role in <strong>${data.projectTitle}</strong> to <strong>${data.newRole}</strong>.`;
-        } else if (name === 'new issue') {
-          messageHTML = `created a new issue <strong>${data.issueTitle}</strong> in <strong>${data.projectTitle}</strong>.`;
-        } else if (name === 'delete issue') {
-          messageHTML = `deleted the issue <strong>${data.issueTitle}</strong> in <strong>${data.projectTitle}</strong>.`;
-        } else if (name === 'assign issue') {
-          messageHTML = `assigned you a new issue.`;
-        } else if (name === 'remove assignee') {
-          messageHTML = `assigned the issue <strong>${data.issueTitle}</strong> to another member.`;
-        } else if (name === 'mark open') {
-          messageHTML = `marked the closed issue <strong>${data.issueTitle}</strong> as Open.`;
-        } else if (name === 'mark in progress') {
-          messageHTML = `marked the ${data.preStatus} issue <strong>${data.issueTitle}</strong> as In Progress.`;
-        } else if (name === 'mark resolved') {
-          messageHTML = `marked the issue <strong>${data.issueTitle}</strong> as Resolved.`;
-        } else if (name === 'mark closed') {
-          messageHTML = `marked the issue <strong>${data.issueTitle}</strong> as Closed.`;
-        } else if (name === 'new comment') {
-          messageHTML = `submitted a new comment.`;
-        }
-
-        const mediaBody = createMediaBody(fullname, messageHTML, timestamp);
-        media.appendChild(mediaBody);
-
-        if (name === 'invitation') {
-          const btnDiv = document.createElement('div');
-          btnDiv.className = 'd-flex flex-sm-column mr-3';
-          const acceptBtn = document.createElement('button');
-          acceptBtn.className = 'btn btn-outline-secondary btn-sm';
-          acceptBtn.textContent = 'Accept';
-
-          let successFunc;
-          if (window.location.pathname === '/dashboard') {
-            successFunc = () => {
-              window.location.reload(true);
-            };
-          } else {
-            successFunc = () => {
-              item.remove();
-            };
-          }
-          acceptBtn.addEventListener('click', function () {
-            postFetch(`/projects/${targetId}/join`, (data2) => {
-              if (data2.success) {
-                successFunc();
-              } else {
-                $('.nav-item .dropdown-toggle').dropdown('hide');
-                const { error } = data2;
-                if (error === 'The project has been removed.') {
-                  deleteNotification(notificationId, item);
-                }
-                addAlert(error, 'danger');
-              }
-            });
-          });
-          btnDiv.appendChild(acceptBtn);
-
-          const deleteBtn = document.createElement('button');
-          deleteBtn.className = 'btn btn-outline-secondary btn-sm mt-1';
-          deleteBtn.textContent = 'Delete';
-          deleteBtn.addEventListener('click', function () {
-            deleteNotification(notificationId, item);
-          });
-          btnDiv.appendChild(deleteBtn);
-
-          media.appendChild(btnDiv);
-        } else if (
-          name === 'assign issue' ||
-          name === 'mark in progress' ||
-          name === 'new comment'
-        ) {
-          const redirectIcon = document.createElement('i');
-          redirectIcon.className =
-            'material-icons mx-2 notification-redirect-icon';
-          redirectIcon.textContent = 'navigate_next';
-          redirectIcon.addEventListener('click', function () {
-            window.location.href = `/projects/${data.projectId}/issues/${targetId}`;
-          });
-          media.appendChild(redirectIcon);
-        }
+      noNotification();
+    }
+    loaded = true;
+  });
+}
 
-        if (!isRead) {
-          const markAsReadBtn = document.createElement('button');
-          markAsReadBtn.className = 'notification-marker ml-2 btn-primary';
-          markAsReadBtn.setAttribute('data-toggle', 'tooltip');
-          markAsReadBtn.setAttribute('data-placement', 'top');
-          markAsReadBtn.setAttribute('title', 'Mark as Read');
-          media.appendChild(markAsReadBtn);
-
-          markAsReadBtn.addEventListener('click', function () {
-            $(markAsReadBtn).tooltip('hide');
-            postFetch(`/notifications/read?id=${notificationId}`, (data2) => {
-              if (data2.success) {
-                item.classList.remove('notification-unread');
-                item.classList.add('notification-read');
-                markAsReadBtn.remove();
-                noNotification();
-              } else {
-                $('.nav-item .dropdown-toggle').dropdown('hide');
-                addAlert(data2.error, 'danger');
-              }
-            });
-          });
-        }
+function loadNextPage() {
+  if (!nextCursor || loadingPage) {
+    return;
+  }
+  loadingPage = true;
+  getFetch(`/notifications?cursor=${nextCursor}`, (json) => {
+    if (json.success) {
+      Object.assign(actors, json.actors);
+      json.notifications.forEach((n) => addNotification(n, false));
+      nextCursor = json.next;
+      noNotification();
+    }
+    loadingPage = false;
+  });
+}
 
-        item.appendChild(media);
-        if (url.includes('since')) {
-          notificationList.prepend(item);
-        } else {
-          notificationList.appendChild(item);
-        }
-      }
+document
+  .querySelector('.notification-dropdown')
+  .addEventListener('scroll', function () {
+    if (this.scrollTop + this.clientHeight >= this.scrollHeight - 50) {
+      loadNextPage();
+    }
+  });
 
-      noNotification();
+// Only asks whether anything is unread, until the list is loaded.
+function updateUnreadCount() {
+  getFetch('/notifications/unread-count', (json) => {
+    if (json.success) {
+      document.getElementById('notification-icon').textContent =
+        json.count > 0 ? 'notifications_active' : 'notifications';
     }
   });
 }
 
+$('.nav-item.dropdown').on('show.bs.dropdown', () => {
+  if (!loaded && !loading) {
+    loading = true;
+    generateNotifications();
+  }
+});
+
 document
   .querySelector('.nav-item .dropdown-menu')
   .addEventListener('click', function (e) {
@@ -278,5 +373,50 @@ document
     }
   });
 
-generateNotifications();
-setInterval(generateNotifications, 20000);
+function pollNotifications() {
+  setInterval(() => {
+    if (loaded) {
+      generateNotifications();
+    } else {
+      updateUnreadCount();
+    }
+  }, 20000);
+}
+
+// Receives new notifications pushed by the server. Falls back to polling if the
+// browser does not support Server-Sent Events or the stream can not be opened.
+function streamNotifications() {
+  if (!window.EventSource) {
+    pollNotifications();
+    return;
+  }
+
+  const source = new EventSource('/notifications/stream');
+  let opened = false;
+  source.addEventListener('open', () => {
+    opened = true;
+  });
+  source.addEventListener('actors', (e) => {
+    Object.assign(actors, JSON.parse(e.data));
+  });
+  source.addEventListener('message', (e) => {
+    if (!loaded) {
+      document.getElementById('notification-icon').textContent =
+        'notifications_active';
+      return;
+    }
+    const n = JSON.parse(e.data);
+    since = n.timestamp;
+    addNotification(n, true);
+    noNotification();
+  });
+  source.addEventListener('error', () => {
+    if (!opened) {
+      source.close();
+      pollNotifications();
+    }
+  });
+}
+
+updateUnreadCount();
+streamNotifications();
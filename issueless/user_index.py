@@ -0,0 +1,159 @@
+"""An optional in-memory prefix index of users for the invite autocomplete.
+
+When USER_SEARCH_INDEX is enabled, each worker keeps the lowercased username and full
+name of every user in two sorted lists, and answers prefix searches with a binary
+search instead of a query. The index is built on the first search and rebuilt every
+REFRESH_INTERVAL seconds. Users created in between are announced on the event bus by
+notify_new_user(), so every worker adds them on its next search. The index is also
+rebuilt if its subscription's queue has filled up, since announcements may have been
+dropped then.
+
+Users are never renamed or deleted, so the index only ever grows between rebuilds.
+When the index is disabled, or a term is the start of more than SCAN_LIMIT usernames,
+search() returns None and callers fall back to SQL.
+
+  Typical usage example:
+
+  user_ids = search('wade', 10)
+  if user_ids is None:
+      users = User.search('wade').limit(10)
+"""
+
+from bisect import bisect_left, insort
+from itertools import chain
+from operator import itemgetter
+import queue
+import threading
+from time import time
+
+from issueless import events
+from issueless.models import db, User
+
+USERS_CHANNEL = 'users'
+REFRESH_INTERVAL = 600
+SCAN_LIMIT = 1000
+
+_MAX_CHAR = chr(0x10FFFF)
+
+_lock = threading.Lock()
+_enabled = False
+_subscriber = None
+_built_at = None
+_user_ids = set()
+# Sorted (username key, full name key, user id) and (full name key, user id) tuples.
+_by_username = []
+_by_full_name = []
+
+
+def init_app(app):
+    """Enables the index if USER_SEARCH_INDEX is set, it is disabled by default."""
+    global _enabled, _subscriber, _built_at
+    _enabled = app.config.get('USER_SEARCH_INDEX', False)
+    if _subscriber is not None:
+        events.unsubscribe(USERS_CHANNEL, _subscriber)
+    _subscriber = _built_at = None
+
+
+def search(term, limit):
+    """Searches users whose username or full name starts with a term.
+
+    Matches like User.search(), ordered by lowercased full name, then by id. The
+    matches by full name are already in that order, so only the first limit of them
+    are picked. The matches by username are not, so all of them are ranked, and a term
+    matching more than SCAN_LIMIT usernames is left to SQL.
+
+    Args:
+        term: The start of a username or a full name.
+        limit: The maximum number of users returned.
+
+    Returns:
+        A list of user ids, None if the index is disabled or too many usernames
+        match.
+    """
+
+    if not _enabled:
+        return None
+    _refresh()
+
+    key = term.lower()
+    by_username = _prefix_slice(_by_username, key, SCAN_LIMIT + 1)
+    if len(by_username) > SCAN_LIMIT:
+        return None
+    # A user matching both ways comes up twice.
+    candidates = sorted(
+        chain(_prefix_slice(_by_full_name, key, limit), by_username),
+        key=itemgetter(-2, -1),
+    )
+    return list(dict.fromkeys(entry[-1] for entry in candidates))[:limit]
+
+
+def notify_new_user(session, user):
+    """Announces a new user to the index of every worker once the session commits."""
+    events.send(session, USERS_CHANNEL, user.id)
+
+
+def _prefix_slice(entries, key, limit):
+    """Gets the first limit entries whose first item starts with key."""
+    start = bisect_left(entries, (key,))
+    end = bisect_left(
+        entries, (key + _MAX_CHAR,), start, min(start + limit, len(entries))
+    )
+    return entries[start:end]
+
+
+def _refresh():
+    global _subscriber
+    with _lock:
+        if _subscriber is None:
+            # Subscribed before the index is built, so no new user is missed.
+            _subscriber = events.subscribe(USERS_CHANNEL)
+        # A full queue may have dropped new users, only a rebuild finds them.
+        if (
+            _built_at is None
+            or _subscriber.full()
+            or time() - _built_at > REFRESH_INTERVAL
+        ):
+            _drain()
+            _build()
+            return
+
+        new_user_ids = _drain() - _user_ids
+        if new_user_ids:
+            _add(_query_users(User.id.in_(new_user_ids)))
+
+
+def _drain():
+    user_ids = set()
+    while True:
+        try:
+            user_ids.add(_subscriber.get_nowait())
+        except queue.Empty:
+            return user_ids
+
+
+def _build():
+    global _built_at, _user_ids, _by_username, _by_full_name
+    users = _query_users()
+    _user_ids = {user_id for user_id, _, _ in users}
+    _by_username = sorted(
+        (username, full_name, user_id) for user_id, username, full_name in users
+    )
+    _by_full_name = sorted((full_name, user_id) for user_id, _, full_name in users)
+    _built_at = time()
+
+
+def _add(users):
+    for user_id, username, full_name in users:
+        _user_ids.add(user_id)
+        insort(_by_username, (username, full_name, user_id))
+        insort(_by_full_name, (full_name, user_id))
+
+
+def _query_users(*criterion):
+    users = db.session.query(
+        User.id, User.username, User.first_name, User.last_name
+    ).filter(*criterion)
+    return [
+        (user_id, username.lower(), f'{first_name} {last_name}'.lower())
+        for user_id, username, first_name, last_name in users
+    ]
@@ -0,0 +1,176 @@
+"""Keep users' notification counts with triggers
+
+Revision ID: 8d1f3a5c7e92
+Revises: 6a8c0e2f4b59
+Create Date: 2026-10-18 22:05:41.318264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d1f3a5c7e92'
+down_revision = '6a8c0e2f4b59'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION count_inserted_notifications() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET
+            notification_count = notification_count + changes.count,
+            unread_notification_count
+                = unread_notification_count + changes.unread_count,
+            notification_version = notification_version + 1
+        FROM (
+            SELECT
+                user_id,
+                count(*) AS count,
+                count(*) FILTER (WHERE NOT is_read) AS unread_count
+            FROM inserted_notifications
+            GROUP BY user_id
+        ) AS changes
+        WHERE users.id = changes.user_id;
+
+        DELETE FROM notifications WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    notifications.id,
+                    row_number() OVER (
+                        PARTITION BY notifications.user_id
+                        ORDER BY notifications.timestamp DESC, notifications.id DESC
+                    ) AS rank
+                FROM notifications JOIN users ON users.id = notifications.user_id
+                WHERE users.notification_count > 50
+                    AND users.id IN (SELECT user_id FROM inserted_notifications)
+            ) AS ranked
+            WHERE rank > 50
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION count_updated_notifications() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET
+            unread_notification_count
+                = unread_notification_count + changes.unread_change,
+            notification_version = notification_version + 1
+        FROM (
+            SELECT
+                updated.user_id,
+                sum((NOT updated.is_read)::int - (NOT previous.is_read)::int)
+                    AS unread_change
+            FROM updated_notifications AS updated
+            JOIN replaced_notifications AS previous ON previous.id = updated.id
+            GROUP BY updated.user_id
+        ) AS changes
+        WHERE users.id = changes.user_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION count_deleted_notifications() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET
+            notification_count = notification_count - changes.count,
+            unread_notification_count
+                = unread_notification_count - changes.unread_count,
+            notification_version = notification_version + 1
+        FROM (
+            SELECT
+                user_id,
+                count(*) AS count,
+                count(*) FILTER (WHERE NOT is_read) AS unread_count
+            FROM deleted_notifications
+            GROUP BY user_id
+        ) AS changes
+        WHERE users.id = changes.user_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER count_inserted_notifications AFTER INSERT ON notifications
+    REFERENCING NEW TABLE AS inserted_notifications
+    FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_notifications();
+    """,
+    """
+    CREATE TRIGGER count_updated_notifications AFTER UPDATE ON notifications
+    REFERENCING NEW TABLE AS updated_notifications
+        OLD TABLE AS replaced_notifications
+    FOR EACH STATEMENT EXECUTE FUNCTION count_updated_notifications();
+    """,
+    """
+    CREATE TRIGGER count_deleted_notifications AFTER DELETE ON notifications
+    REFERENCING OLD TABLE AS deleted_notifications
+    FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_notifications();
+    """,
+]
+
+
+def upgrade():
+    op.execute(
+        """
+        DELETE FROM notifications WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    id,
+                    row_number() OVER (
+                        PARTITION BY user_id, name, target_id
+                        ORDER BY timestamp DESC, id DESC
+                    ) AS rank
+                FROM notifications
+                WHERE name IN ('invitation')
+            ) AS ranked
+            WHERE rank > 1
+        );
+        DELETE FROM notifications WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    id,
+                    row_number() OVER (
+                        PARTITION BY user_id ORDER BY timestamp DESC, id DESC
+                    ) AS rank
+                FROM notifications
+            ) AS ranked
+            WHERE rank > 50
+        );
+        UPDATE users SET
+            notification_count = (
+                SELECT count(*) FROM notifications
+                WHERE notifications.user_id = users.id
+            ),
+            unread_notification_count = (
+                SELECT count(*) FROM notifications
+                WHERE notifications.user_id = users.id AND NOT is_read
+            );
+        """
+    )
+    op.create_index(
+        'ix_notifications_replaced',
+        'notifications',
+        ['user_id', 'name', 'target_id'],
+        unique=True,
+        postgresql_where=sa.text("name IN ('invitation')"),
+    )
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade():
+    op.execute(
+        """
+        DROP TRIGGER count_deleted_notifications ON notifications;
+        DROP TRIGGER count_updated_notifications ON notifications;
+        DROP TRIGGER count_inserted_notifications ON notifications;
+        DROP FUNCTION count_deleted_notifications();
+        DROP FUNCTION count_updated_notifications();
+        DROP FUNCTION count_inserted_notifications();
+        """
+    )
+    op.drop_index('ix_notifications_replaced', table_name='notifications')
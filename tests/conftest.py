@@ -29,6 +29,7 @@ def app():
 
     db.create_all()
     Role.insert_roles()  # this method is tested in test_role_model.py
+    Role.refresh_registry()
     db.session.execute(_data_sql)
     db.session.commit()
     for i in range(1, 5):
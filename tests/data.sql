@@ -1,34 +1,48 @@
 INSERT INTO
-  users (sub, email, username, first_name, last_name)
+  users (
+    sub,
+    email,
+    username,
+    first_name,
+    last_name,
+    avatar_hash,
+    project_count
+  )
 VALUES
   (
     'test_sub_1',
     'test1@gmail.com',
     'test_username_1',
     'David',
-    'Johnson'
+    'Johnson',
+    '245cf079454dc9a3374a7c076de247cc',
+    3
   ),
   (
     'test_sub_2',
     'test2@gmail.com',
     'test_username_2',
     'Wade',
-    'Tom'
+    'Tom',
+    '3c4f419e8cd958690d0d14b3b89380d3',
+    2
   ),
   (
     'test_sub_3',
     'test3@gmail.com',
     'test_username_3',
     'Ryan',
-    'Cooper'
+    'Cooper',
+    '19f84906f4412abf6066aaa92fe9d6c1',
+    2
   );
 
 INSERT INTO
-  projects (title, description)
+  projects (title, description, member_count)
 VALUES
-  ('test_title_1', 'test_description_1'),
-  ('test_title_2', 'test_description_2'),
-  ('test_title_3', 'test_description_3');
+  ('test_title_1', 'test_description_1', 3),
+  ('test_title_2', 'test_description_2', 2),
+  ('test_title_3', 'test_description_3', 2);
 
 INSERT INTO
   user_projects (user_id, project_id, role_id, timestamp)
@@ -1,3 +1,26 @@
+from flask_login import login_user
+
+from issueless.decorators import get_membership
+from issueless.models import User
+
+
+def test_get_membership(app):
+    with app.test_request_context():
+        login_user(User.query.get(3))
+
+        project, user_project, role = get_membership(1)
+        assert project.id == 1
+        assert user_project.user_id == 3
+        assert role.name == 'Developer'
+        assert get_membership(1)[1] is user_project
+
+        project, user_project, role = get_membership(2)
+        assert project.id == 2
+        assert user_project is None and role is None
+
+        assert get_membership(10) == (None, None, None)
+
+
 def test_permission_required(client, auth):
     auth.login(2)
 
@@ -81,4 +104,3 @@ def test_comment_and_upload_permission_required(client, auth):
     assert client.post('/projects/1/issues/10/upload').status_code == 404
     assert client.post('/projects/3/issues/1/upload').status_code == 400
     assert client.post('/projects/1/issues/1/upload').status_code == 400
-
@@ -0,0 +1,34 @@
+import json
+
+from issueless import events
+from issueless.models import db
+
+
+def test_send(app):
+    subscriber = events.subscribe('test')
+
+    events.send(db.session, 'test', 'rolled back')
+    db.session.rollback()
+    assert subscriber.empty()
+
+    events.send(db.session, 'test', 'committed')
+    db.session.commit()
+    assert subscriber.get_nowait() == 'committed'
+    assert subscriber.empty()
+
+    events.unsubscribe('test', subscriber)
+    events.send(db.session, 'test', 'unsubscribed')
+    db.session.commit()
+    assert subscriber.empty()
+
+
+def test_batch_payloads(monkeypatch):
+    monkeypatch.setattr(events, 'MAX_PAYLOAD_SIZE', 50)
+    messages = [(events.notification_channel(i), 'new') for i in range(10)]
+
+    payloads = events._batch_payloads(messages)
+    assert len(payloads) > 1
+    assert all(len(payload) <= 50 for payload in payloads)
+    assert [
+        tuple(item) for payload in payloads for item in json.loads(payload)
+    ] == messages
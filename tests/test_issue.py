@@ -1,7 +1,8 @@
 import json
 import os
 
-from issueless.models import Issue
+from issueless.issue.helpers import remove_upload
+from issueless.models import db, Issue
 
 
 def test_invalid_create(client, auth):
@@ -221,6 +222,31 @@ def test_delete(app, client, auth):
     assert not os.path.isdir(os.path.join(app.config['UPLOAD_PATH'], '2'))
 
 
+def test_remove_upload(app):
+    directory = os.path.join(app.config['UPLOAD_PATH'], '1')
+    path = os.path.join(directory, 'test.txt')
+    with open(path, 'w') as f:
+        f.write('test')
+
+    remove_upload('1', 'test.txt')
+    assert not os.path.exists(path)
+    db.session.rollback()
+    with open(path) as f:
+        assert f.read() == 'test'
+
+    remove_upload('1', 'test.txt')
+    with open(path, 'w') as f:
+        f.write('reuploaded')
+    db.session.commit()
+    assert os.listdir(directory) == ['test.txt']
+    with open(path) as f:
+        assert f.read() == 'reuploaded'
+
+    remove_upload('1')
+    db.session.commit()
+    assert not os.path.exists(directory)
+
+
 def test_invalid_assign(client, auth):
     auth.login(2)
 
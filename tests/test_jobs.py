@@ -0,0 +1,58 @@
+from time import time
+
+from issueless import jobs
+from issueless.models import db, Job, User
+
+
+def test_run_next(app, monkeypatch):
+    monkeypatch.setattr(jobs, '_eager', False)
+
+    jobs.enqueue(
+        'fan out notification',
+        user_ids=[1, 3],
+        name='test',
+        data={'projectTitle': 'test_title_1'},
+        target_id=None,
+        actor_id=2,
+    )
+    db.session.commit()
+    assert User.query.get(1).notifications.count() == 0
+
+    job = Job.query.one()
+    assert job.name == 'fan out notification'
+    assert job.attempts == 0
+
+    assert jobs.run_next()
+    assert Job.query.count() == 0
+    notification = User.query.get(1).notifications.one()
+    assert notification.name == 'test'
+    assert notification.actor_id == 2
+    assert User.query.get(3).notifications.filter_by(name='test').count() == 1
+
+    assert not jobs.run_next()
+
+
+def test_retry(app, monkeypatch):
+    monkeypatch.setattr(jobs, '_eager', False)
+
+    def fail():
+        raise ValueError('test_error')
+
+    monkeypatch.setitem(jobs._handlers, 'test', fail)
+    jobs.enqueue('test')
+    db.session.commit()
+
+    assert jobs.run_next()
+    job = Job.query.one()
+    assert job.attempts == 1
+    assert job.run_at > time()
+    assert 'test_error' in job.last_error
+    assert not jobs.run_next()
+
+    job.attempts = jobs.MAX_ATTEMPTS - 1
+    job.run_at = time()
+    db.session.commit()
+    assert jobs.run_next()
+    assert job.attempts == jobs.MAX_ATTEMPTS
+    assert job.run_at is None
+    assert not jobs.run_next()
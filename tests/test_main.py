@@ -1,6 +1,15 @@
 import json
 
-from issueless.models import Notification
+from issueless.main.helpers import get_missing_review_issues, render_project_cards
+from issueless.models import (
+    db,
+    Comment,
+    Issue,
+    Notification,
+    Project,
+    User,
+    UserProject,
+)
 
 
 def test_index(client, auth):
@@ -14,6 +23,49 @@ def test_dashboard(client, auth):
     assert resp.status_code == 200
 
 
+def test_project_cards(app):
+    user_projects = User.query.get(1).user_projects.order_by(UserProject.timestamp)
+    with app.test_request_context():
+        cards = render_project_cards(user_projects.all())
+        assert len(cards) == 3
+        assert 'test_title_1' in cards[0]
+        assert 'Delete Project' in cards[0]
+        assert 'Leave Project' in cards[1]
+        assert len(app.extensions['project_card_cache']) == 3
+
+        assert render_project_cards(user_projects.all()) == cards
+
+        Project.query.get(1).title = 'modified_title'
+        db.session.commit()
+        new_cards = render_project_cards(user_projects.all())
+        assert 'modified_title' in new_cards[0]
+        assert new_cards[1:] == cards[1:]
+
+
+def test_avatar(app, client, auth, tmp_path):
+    app.config['AVATAR_PATH'] = str(tmp_path)
+    app.config['GRAVATAR_URL'] = None
+    avatar_hash = '245cf079454dc9a3374a7c076de247cc'
+    assert client.get(f'/avatars/{avatar_hash}').status_code == 302
+
+    auth.login(1)
+    assert client.get('/avatars/not-a-hash').status_code == 404
+    assert client.get(f'/avatars/{"0" * 32}').status_code == 404
+
+    resp = client.get(f'/avatars/{avatar_hash}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'image/svg+xml'
+    assert resp.cache_control.max_age == 3600
+    assert client.get(f'/avatars/{avatar_hash}').data == resp.data
+
+    (tmp_path / f'{avatar_hash}.png').write_bytes(b'\x89PNG')
+    resp = client.get(f'/avatars/{avatar_hash}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'image/png'
+    assert resp.data == b'\x89PNG'
+    assert resp.cache_control.max_age == 7 * 24 * 60 * 60
+
+
 def test_notifications(client, auth):
     auth.login(2)
 
@@ -33,6 +85,7 @@ def test_notifications(client, auth):
         'projectTitle': 'test_title_3',
         'roleName': 'Developer',
     }
+    assert data['actors'] == {}
 
     resp = client.get('/notifications?since=1593406942')
     assert resp.status_code == 200
@@ -60,6 +113,34 @@ def test_notifications(client, auth):
     assert not notifications
 
 
+def test_notification_pages(client, auth):
+    auth.login(2)
+    user = User.query.get(2)
+    for i in range(25):
+        user.add_notification('test', {})
+    db.session.commit()
+
+    data = json.loads(client.get('/notifications').data)
+    notifications = data['notifications']
+    assert len(notifications) == 20
+    assert notifications[0]['notificationId'] == 27
+    assert data['next']
+
+    data = json.loads(client.get(f'/notifications?cursor={data["next"]}').data)
+    notifications = data['notifications']
+    assert len(notifications) == 6
+    assert notifications[0]['notificationId'] == 7
+    assert notifications[-1]['notificationId'] == 2
+    assert data['next'] is None
+
+    data = json.loads(client.get('/notifications?limit=100').data)
+    assert len(data['notifications']) == 26
+    assert data['next'] is None
+
+    assert client.get('/notifications?limit=0').status_code == 400
+    assert client.get('/notifications?cursor=invalid').status_code == 400
+
+
 def test_delete_notification(client, auth):
     auth.login(3)
 
@@ -100,5 +181,123 @@ def test_read_notification(client, auth):
     assert resp.status_code == 200
     data = json.loads(resp.data)
     assert data['success']
+    assert data['count'] == 1
     assert Notification.query.get(1).is_read
 
+    user = User.query.get(3)
+    for i in range(3):
+        user.add_notification('test', {})
+    db.session.commit()
+
+    assert client.post('/notifications/read', json={'ids': '3'}).status_code == 400
+
+    resp = client.post('/notifications/read', json={'ids': [1, 2, 3, 4]})
+    assert resp.status_code == 200
+    data = json.loads(resp.data)
+    assert data['count'] == 2
+    assert Notification.query.get(3).is_read
+    assert Notification.query.get(4).is_read
+    assert not Notification.query.get(5).is_read
+
+
+def test_unread_notification_count(client, auth):
+    auth.login(3)
+
+    resp = client.get('/notifications/unread-count')
+    assert resp.status_code == 200
+    data = json.loads(resp.data)
+    assert data['success']
+    assert data['count'] == 1
+
+    user = User.query.get(3)
+    for i in range(2):
+        user.add_notification('test', {})
+    db.session.commit()
+    assert json.loads(client.get('/notifications/unread-count').data)['count'] == 3
+
+    client.post('/notifications/read?id=1')
+    assert json.loads(client.get('/notifications/unread-count').data)['count'] == 2
+
+    client.post('/notifications/3/delete')
+    assert json.loads(client.get('/notifications/unread-count').data)['count'] == 1
+
+    Notification.fan_out([3], 'test', {})
+    db.session.commit()
+    assert json.loads(client.get('/notifications/unread-count').data)['count'] == 2
+
+
+def test_missing_review_issues(app):
+    user = User.query.get(1)
+    assert get_missing_review_issues(user) == []
+
+    db.session.add(Comment(text='test_text_1', user_id=1, issue_id=2))
+    db.session.commit()
+    assert get_missing_review_issues(user) == []
+
+    db.session.add(Comment(text='test_text_2', user_id=3, issue_id=2))
+    db.session.commit()
+    assert get_missing_review_issues(user) == [Issue.query.get(2)]
+    assert get_missing_review_issues(User.query.get(3)) == []
+
+
+def test_notification_stream(client, auth):
+    auth.login(2)
+
+    resp = client.get('/notifications/stream?since=0')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/event-stream'
+    event = next(resp.response).decode()
+    assert event.startswith('id: 1593406942.200693\n')
+    data = json.loads(event.split('data: ')[1])
+    assert data['notificationId'] == 2
+    assert data['name'] == 'invitation'
+    resp.close()
+
+
+def test_notifications_etag(client, auth):
+    auth.login(2)
+
+    resp = client.get('/notifications')
+    etag = resp.headers['ETag']
+    assert etag
+
+    resp = client.get('/notifications', headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert not resp.data
+
+    for query_string in ('?limit=1', '?cursor=1593406942.2_2', '?since=0'):
+        resp = client.get(
+            f'/notifications{query_string}', headers={'If-None-Match': etag}
+        )
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etag
+
+    User.query.get(2).add_notification('test', {})
+    db.session.commit()
+    resp = client.get('/notifications', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+    etag = resp.headers['ETag']
+
+    client.post('/notifications/read?id=2')
+    resp = client.get('/notifications?since=0', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+
+
+def test_notification_actors(app, client, auth):
+    auth.login(2)
+    client.post(
+        '/projects/2/invite', json={'target': 'test_username_3', 'role': 'Developer'}
+    )
+    user = User.query.get(2)
+
+    auth.login(3)
+    data = json.loads(client.get('/notifications').data)
+    notification = data['notifications'][0]
+    assert notification['actorId'] == 2
+    assert notification['data'] == {
+        'projectTitle': 'test_title_2',
+        'roleName': 'Developer',
+    }
+    with app.test_request_context():
+        assert data['actors'] == {'2': user.actor()}
@@ -1,6 +1,6 @@
 import json
 
-from issueless.models import db, Notification, Project, User, UserProject
+from issueless.models import db, Issue, Notification, Project, User, UserProject
 
 
 def test_project(client, auth):
@@ -165,6 +165,7 @@ def test_delete(client, auth):
     assert resp.status_code == 302
     assert 'http://localhost/dashboard' == resp.headers['Location']
     assert Project.query.get(1) is None
+    assert [user.project_count for user in User.query.order_by(User.id)] == [2, 1, 1]
 
     assert (
         Notification.query.filter_by(name='delete project', user_id=1).first() is None
@@ -191,22 +192,19 @@ def test_invite_get(client, auth):
         {
             'fullname': 'David Johnson',
             'username': 'test_username_1',
-            'avatar': 'https://www.gravatar.com/avatar/245cf079454dc9a3374a7c076de247cc'
-            '?d=identicon&s=68',
+            'avatar': '/avatars/245cf079454dc9a3374a7c076de247cc',
             'joined': True,
         },
         {
             'fullname': 'Ryan Cooper',
             'username': 'test_username_3',
-            'avatar': 'https://www.gravatar.com/avatar/19f84906f4412abf6066aaa92fe9d6c1'
-            '?d=identicon&s=68',
+            'avatar': '/avatars/19f84906f4412abf6066aaa92fe9d6c1',
             'joined': True,
         },
         {
             'fullname': 'Wade Tom',
             'username': 'test_username_2',
-            'avatar': 'https://www.gravatar.com/avatar/3c4f419e8cd958690d0d14b3b89380d3'
-            '?d=identicon&s=68',
+            'avatar': '/avatars/3c4f419e8cd958690d0d14b3b89380d3',
             'joined': True,
         },
     ]
@@ -218,8 +216,7 @@ def test_invite_get(client, auth):
         {
             'fullname': 'David Johnson',
             'username': 'test_username_1',
-            'avatar': 'https://www.gravatar.com/avatar/245cf079454dc9a3374a7c076de247cc'
-            '?d=identicon&s=68',
+            'avatar': '/avatars/245cf079454dc9a3374a7c076de247cc',
             'joined': True,
         }
     ]
@@ -231,12 +228,21 @@ def test_invite_get(client, auth):
         {
             'fullname': 'Wade Tom',
             'username': 'test_username_2',
-            'avatar': 'https://www.gravatar.com/avatar/3c4f419e8cd958690d0d14b3b89380d3'
-            '?d=identicon&s=68',
+            'avatar': '/avatars/3c4f419e8cd958690d0d14b3b89380d3',
             'joined': True,
         }
     ]
 
+    auth.login(2)
+    resp = client.get('/projects/2/invite?search=test_username')
+    assert resp.status_code == 200
+    data = json.loads(resp.data)
+    assert [(user['username'], user['joined']) for user in data['users']] == [
+        ('test_username_1', True),
+        ('test_username_3', False),
+        ('test_username_2', True),
+    ]
+
 
 def test_invalid_invite_post(client, auth):
     auth.login(2)
@@ -308,19 +314,13 @@ def test_valid_invite_post(client, auth):
     data = json.loads(resp.data)
     assert data['success']
 
-    notification = Notification.query.get(3)
+    notification = Notification.query.filter_by(user_id=3, target_id=2).one()
     assert notification.name == 'invitation'
-    assert notification.target_id == 2
-    assert notification.user_id == 3
-    data = notification.get_data()
-    assert (
-        data['avatar']
-        == 'https://www.gravatar.com/avatar/3c4f419e8cd958690d0d14b3b89380d3?d='
-        'identicon&s=68'
-    )
-    assert data['fullname'] == 'Wade Tom'
-    assert data['projectTitle'] == 'test_title_2'
-    assert data['roleName'] == 'Developer'
+    assert notification.actor_id == 2
+    assert notification.get_data() == {
+        'projectTitle': 'test_title_2',
+        'roleName': 'Developer',
+    }
     timestamp = notification.timestamp
 
     resp = client.post(
@@ -329,9 +329,8 @@ def test_valid_invite_post(client, auth):
     assert resp.status_code == 200
     data = json.loads(resp.data)
     assert data['success']
-    notification = Notification.query.get(4)
+    notification = Notification.query.filter_by(user_id=3, target_id=2).one()
     assert notification.timestamp > timestamp
-    assert Notification.query.get(3) is None
     timestamp = notification.timestamp
 
     resp = client.post(
@@ -347,9 +346,8 @@ def test_valid_invite_post(client, auth):
     assert resp.status_code == 200
     data = json.loads(resp.data)
     assert data['success']
-    notification = Notification.query.get(5)
+    notification = Notification.query.filter_by(user_id=3, target_id=2).one()
     assert notification.timestamp > timestamp
-    assert Notification.query.get(4) is None
 
 
 def test_invalid_join(client, auth):
@@ -360,6 +358,7 @@ def test_invalid_join(client, auth):
 
 def test_valid_join(client, auth):
     auth.login(3)
+    assert json.loads(client.get('/notifications/unread-count').data)['count'] == 1
 
     resp = client.post('/projects/2/join')
     assert resp.status_code == 200
@@ -371,6 +370,7 @@ def test_valid_join(client, auth):
     assert user_project.role.name == 'Developer'
 
     assert Notification.query.get(1) is None
+    assert json.loads(client.get('/notifications/unread-count').data)['count'] == 0
 
     notification = Notification.query.filter_by(
         name='join project', user_id=user_project.project.get_admin().id
@@ -386,6 +386,8 @@ def test_quit(client, auth):
     assert 'http://localhost/dashboard' == resp.headers['Location']
 
     assert UserProject.query.filter_by(user_id=2, project_id=1).first() is None
+    assert User.query.get(2).project_count == 1
+    assert Project.query.get(1).member_count == 2
     assert (
         Notification.query.filter_by(name='quit project', user_id=1).first() is not None
     )
@@ -453,3 +455,83 @@ def test_valid_change_role(client, auth):
     data = json.loads(resp.data)
     assert data['success']
     assert user_project.role.name == 'Developer'
+
+
+def test_get_issue_board(app):
+    project = Project.query.get(1)
+    project.issues.filter_by(id=1).first().priority = 'Low'
+    db.session.add(
+        Issue(
+            title='test_title_5',
+            description='test_description_5',
+            priority='Low',
+            status='In Progress',
+            creator_id=1,
+            assignee_id=1,
+            project=project,
+        )
+    )
+    db.session.commit()
+
+    board = project.get_issue_board()
+    assert [issue.id for issue in board['Open']] == [1]
+    assert [issue.id for issue in board['In Progress']] == [2, 5]
+    assert [issue.id for issue in board['Resolved']] == [3]
+    assert [issue.id for issue in board['Closed']] == [4]
+
+
+def test_has_member(app):
+    project = Project.query.get(2)
+    assert project.has_member(1)
+    assert project.has_member(2)
+    assert not project.has_member(3)
+    assert not project.has_member(10)
+
+
+def test_get_top_members(app):
+    members = Project.get_top_members([1, 2], 2)
+    assert members[1][0] == 3
+    assert len(members[1][1]) == 2
+    assert members[2][0] == 2
+    assert {user.id for user in members[2][1]} == {1, 2}
+    assert Project.get_top_members([4], 2) == {}
+
+
+def test_get_issue_counts(app):
+    assert Project.get_issue_counts([1, 2]) == {
+        1: {'Open': 1, 'In Progress': 1, 'Resolved': 1, 'Closed': 1}
+    }
+
+
+def test_board_cache(app, client, auth):
+    auth.login(1)
+
+    resp = client.get('/projects/1')
+    assert b'test_title_1' in resp.data
+    assert (1, 0, 'Admin') in app.extensions['board_cache']
+
+    # The board is served from the cache while the project does not change.
+    app.extensions['board_cache'][(1, 0, 'Admin')] = 'cached_board'
+    assert b'cached_board' in client.get('/projects/1').data
+
+    client.post(
+        '/projects/1/edit',
+        json={'title': 'modified_title', 'description': 'modified_description'},
+    )
+    assert Project.query.get(1).version == 1
+    resp = client.get('/projects/1')
+    assert b'cached_board' not in resp.data
+    assert b'modified_title' in resp.data
+
+    Issue.query.get(1).title = 'modified_issue_title'
+    db.session.commit()
+    assert Project.query.get(1).version == 2
+    assert b'modified_issue_title' in client.get('/projects/1').data
+
+
+def test_board_per_user_style(client, auth):
+    auth.login(3)
+
+    resp = client.get('/projects/1')
+    assert b'.creator-only:not([data-creator-id="3"])' in resp.data
+    assert b'data-creator-id="3"' in resp.data
@@ -1,4 +1,4 @@
-from issueless.models import Permission, Role
+from issueless.models import db, Permission, Role, UserProject
 
 # TODO: add tests
 
@@ -25,3 +25,28 @@ def test_has_permission(app):
 
     reviewer_role = Role.query.get(2)
     assert not reviewer_role.has_permission(Permission.MANAGE_PROJECT)
+
+
+def test_registry(app):
+    assert Role.get_id('Admin') == 1
+    assert Role.get_permissions(2) == Role.query.get(2).permissions
+    assert Role.get_id('Unknown') is None
+    assert Role.get_permissions(10) is None
+
+    role = Role.query.get(3)
+    role.add_permission(Permission.MANAGE_ISSUES)
+    db.session.commit()
+    assert not Role.get_permissions(3) & Permission.MANAGE_ISSUES
+    Role.refresh_registry()
+    assert Role.get_permissions(3) & Permission.MANAGE_ISSUES
+
+
+def test_change_role(app):
+    user_project = UserProject.query.get((2, 1))
+    assert user_project.role.name == 'Reviewer'
+    assert user_project.can(Permission.MANAGE_ISSUES)
+
+    assert user_project.change_role() == 'Developer'
+    assert user_project.role.name == 'Developer'
+    assert not user_project.can(Permission.MANAGE_ISSUES)
+    assert user_project.can(Permission.READ_PROJECT)
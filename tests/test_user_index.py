@@ -0,0 +1,66 @@
+import json
+
+from issueless import events, user_index
+from issueless.models import db, User
+
+
+def test_search(app, monkeypatch):
+    assert user_index.search('test_username', 10) is None
+
+    monkeypatch.setattr(user_index, '_enabled', True)
+    assert user_index.search('TEST_username', 10) == [1, 3, 2]
+    assert user_index.search('test_username', 2) == [1, 3]
+    assert user_index.search('wade t', 10) == [2]
+    assert user_index.search('ryan cooper', 10) == [3]
+    assert user_index.search('test_username_4', 10) == []
+
+    user = User(
+        sub='test_sub_4',
+        email='test4@gmail.com',
+        username='test_username_4',
+        first_name='Adam',
+        last_name='Smith',
+    )
+    db.session.add(user)
+    db.session.flush()
+    user_index.notify_new_user(db.session, user)
+    db.session.commit()
+    assert user_index.search('test_username', 10) == [4, 1, 3, 2]
+
+    user = User(
+        sub='test_sub_5',
+        email='test5@gmail.com',
+        username='test_username_5',
+        first_name='Bob',
+        last_name='Brown',
+    )
+    db.session.add(user)
+    db.session.flush()
+    # The announcement is dropped, but a full queue makes the index rebuild.
+    for i in range(user_index._subscriber.maxsize):
+        events.send(db.session, user_index.USERS_CHANNEL, 1)
+    user_index.notify_new_user(db.session, user)
+    db.session.commit()
+    assert user_index._subscriber.full()
+    assert user_index.search('bob', 10) == [5]
+    assert user_index._subscriber.empty()
+
+    monkeypatch.setattr(user_index, 'SCAN_LIMIT', 5)
+    assert user_index.search('test_username', 10) == [4, 5, 1, 3, 2]
+    monkeypatch.setattr(user_index, 'SCAN_LIMIT', 4)
+    assert user_index.search('test_username', 10) is None
+    assert user_index.search('wade', 10) == [2]
+
+
+def test_invite_search(client, auth, monkeypatch):
+    monkeypatch.setattr(user_index, '_enabled', True)
+    auth.login(2)
+
+    resp = client.get('/projects/2/invite?search=test_username')
+    assert resp.status_code == 200
+    data = json.loads(resp.data)
+    assert [(user['username'], user['joined']) for user in data['users']] == [
+        ('test_username_1', True),
+        ('test_username_3', False),
+        ('test_username_2', True),
+    ]
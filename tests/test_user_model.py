@@ -1,12 +1,30 @@
-from issueless.models import db, Notification, Project, User
+from issueless.models import (
+    db,
+    MAX_NOTIFICATIONS,
+    MEMBER_LIMIT_ERROR,
+    Notification,
+    Project,
+    PROJECT_LIMIT_ERROR,
+    User,
+)
 
 
 def test_avatar(app):
     user = User.query.filter_by(email='test1@gmail.com').first()
-    assert user.avatar() == (
-        'https://www.gravatar.com/avatar/245cf079454dc9a3374a7c076de247cc?d='
-        'identicon&s=68'
-    )
+    with app.test_request_context():
+        assert user.avatar() == '/avatars/245cf079454dc9a3374a7c076de247cc'
+
+    user.email = 'Test2@gmail.com'
+    db.session.commit()
+    assert user.avatar_hash == '3c4f419e8cd958690d0d14b3b89380d3'
+
+
+def test_search(app):
+    assert [user.id for user in User.search('TEST_username')] == [1, 3, 2]
+    assert [user.id for user in User.search('wade t')] == [2]
+    assert [user.id for user in User.search('Ryan Cooper')] == [3]
+    assert User.search('%').all() == []
+    assert User.search('test%username').all() == []
 
 
 def test_add_project(app):
@@ -23,21 +41,118 @@ def test_add_project(app):
     user_project = user.user_projects.filter_by(project_id=4).first()
     role = user_project.role
     assert role.name == 'Admin'
+    assert user.project_count == 4
+    assert new_project.member_count == 1
+
+
+def test_project_limits(app):
+    user = User.query.get(1)
+    for i in range(4, 9):
+        project = Project(title=f'test_title_{i}', description=f'test_description_{i}')
+        assert user.add_project(project, 'Admin') is None
+    db.session.commit()
+    assert user.project_count == 8
+
+    project = Project(title='test_title_9', description='test_description_9')
+    assert user.add_project(project, 'Admin') == PROJECT_LIMIT_ERROR
+    db.session.rollback()
+    assert user.project_count == 8
+
+    project = Project.query.get(3)
+    project.member_count = 30
+    db.session.commit()
+    user = User.query.get(2)
+    assert user.add_project(project, 'Developer') == MEMBER_LIMIT_ERROR
+    db.session.commit()
+    assert user.project_count == 2
+    assert not project.has_member(2)
+
+    user.user_projects.filter_by(project_id=1).one().remove()
+    db.session.commit()
+    assert user.project_count == 1
+    assert Project.query.get(1).member_count == 2
 
 
 def test_add_notification(app):
     user = User.query.get(2)
 
-    old_timestamp = Notification.query.get(2).timestamp
+    notification = Notification.query.get(2)
+    notification.is_read = True
+    db.session.commit()
+    assert user.unread_notification_count == 0
+
+    old_timestamp = notification.timestamp
     user.add_notification('invitation', {}, 3)
-    assert Notification.query.get(2) is None
-    notification = Notification.query.get(3)
-    assert notification is not None
+    db.session.commit()
+    notification = user.notifications.filter_by(name='invitation', target_id=3).one()
     assert notification.timestamp > old_timestamp
+    assert not notification.is_read
+    assert user.notification_count == 1
+    assert user.unread_notification_count == 1
 
-    for i in range(2, 51):
+
+def test_trim_notifications(app):
+    user = User.query.get(2)
+    for i in range(MAX_NOTIFICATIONS - 1):
         user.add_notification('test', {})
-    assert user.notifications.count() == 50
+    db.session.commit()
+    assert user.notification_count == MAX_NOTIFICATIONS
+    assert user.unread_notification_count == MAX_NOTIFICATIONS
+
     user.add_notification('test', {})
-    assert user.notifications.count() == 50
+    db.session.commit()
+    assert user.notification_count == MAX_NOTIFICATIONS
+    assert user.unread_notification_count == MAX_NOTIFICATIONS
+    assert user.notifications.count() == MAX_NOTIFICATIONS
     assert Notification.query.get(2) is None
+
+    version = user.notification_version
+    Notification.mark_as_read(2)
+    db.session.commit()
+    assert user.unread_notification_count == 0
+    assert user.notification_version > version
+
+
+def test_fan_out_notification(app):
+    for i in range(MAX_NOTIFICATIONS):
+        User.query.get(1).add_notification('test', {})
+    db.session.commit()
+
+    Notification.fan_out([1, 2, 3], 'test', {'projectTitle': 'test_title_1'}, 1)
+    db.session.commit()
+
+    assert User.query.get(1).notifications.count() == MAX_NOTIFICATIONS
+    assert User.query.get(1).notification_count == MAX_NOTIFICATIONS
+    assert User.query.get(2).notifications.count() == 2
+    notification = User.query.get(3).notifications.filter_by(name='test').first()
+    assert notification.target_id == 1
+    assert notification.get_data() == {'projectTitle': 'test_title_1'}
+
+
+def test_get_actors(app):
+    user = User.query.get(1)
+    with app.test_request_context():
+        assert user.actor() == {'fullname': user.fullname(), 'avatar': user.avatar()}
+        assert User.get_actors([1, 1, None, 10]) == {1: user.actor()}
+
+
+def test_coalesce_notification(app):
+    user = User.query.get(3)
+    user.add_notification('new comment', {'projectId': 1}, 2)
+    db.session.commit()
+    notification = user.notifications.filter_by(name='new comment').one()
+    timestamp = notification.timestamp
+
+    Notification.fan_out([2, 3], 'new comment', {'projectId': 1}, 2)
+    db.session.commit()
+    assert user.notifications.filter_by(name='new comment').count() == 1
+    assert notification.occurrences == 2
+    assert notification.timestamp >= timestamp
+    other = User.query.get(2).notifications.filter_by(name='new comment').one()
+    assert other.occurrences == 1
+
+    notification.is_read = True
+    db.session.commit()
+    user.add_notification('new comment', {'projectId': 1}, 2)
+    db.session.commit()
+    assert user.notifications.filter_by(name='new comment').count() == 2